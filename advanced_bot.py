@@ -1,5 +1,6 @@
 import os
-import time
+import signal
+import sys
 import json
 import ccxt
 import pandas as pd
@@ -10,6 +11,10 @@ from datetime import datetime, time as dt_time
 import pytz 
 from math import floor
 from dotenv import load_dotenv
+from scheduler import CandleScheduler, drop_open_candle
+from trade_journal import RecordingExchange
+from resilient_exchange import ResilientExchange
+from event_bus import bus
 
 # 1. Configuración de Logs
 logging.basicConfig(
@@ -20,18 +25,21 @@ logging.basicConfig(
 logger = logging.getLogger("BitsoHybridBot")
 
 class BitsoTradingBot:
-    def __init__(self, config_path):
+    def __init__(self, config_path, exchange=None, notify=True):
         load_dotenv()
         with open(config_path, 'r') as f:
             self.config = json.load(f)
             
-        self.exchange = ccxt.bitso({
+        self.exchange = exchange or ResilientExchange(ccxt.bitso({
             'apiKey': os.getenv('BITSO_API_KEY'),
             'secret': os.getenv('BITSO_API_SECRET'),
             'enableRateLimit': True
-        })
+        }), self.config.get('resilience', {}))
+        # Grabar cada respuesta del exchange para poder reproducir la sesión
+        if exchange is None and self.config.get('record_journal'):
+            self.exchange = RecordingExchange(self.exchange, self.config['record_journal'])
         
-        self.telegram_token = os.getenv('TELEGRAM_TOKEN')
+        self.telegram_token = os.getenv('TELEGRAM_TOKEN') if notify else None
         self.telegram_chat_id = os.getenv('TELEGRAM_CHAT_ID')
         self.symbols = self.config.get('symbols', ['BTC/MXN', 'NVDA/MXN', 'AAPL/MXN'])
         self.timeframe = self.config.get('timeframe', '5m')
@@ -59,7 +67,8 @@ class BitsoTradingBot:
         criptos = ['BTC', 'ETH', 'XRP', 'SOL', 'LTC', 'USD']
         if any(c in symbol.upper() for c in criptos): return True
         tz_ny = pytz.timezone('America/New_York')
-        now_ny = datetime.now(tz_ny)
+        # Hora del exchange (en una reproducción, la hora grabada)
+        now_ny = datetime.fromtimestamp(self.exchange.milliseconds() / 1000, tz_ny)
         if now_ny.weekday() >= 5: return False
         return dt_time(9, 30) <= now_ny.time() <= dt_time(16, 0)
 
@@ -75,51 +84,103 @@ class BitsoTradingBot:
         precision = market['precision']['amount']
         return floor(amount * (10**precision)) / (10**precision)
 
+    def close(self):
+        """Cierra el exchange: vuelca el diario de grabación y libera conexiones"""
+        close = getattr(self.exchange, 'close', None)
+        if close:
+            close()
+
     def run_cycle(self):
         for symbol in self.symbols:
-            if not self.is_market_open(symbol): continue
-            logger.info(f"--- Analizando {symbol} ---")
-            try:
-                ohlcv = self.exchange.fetch_ohlcv(symbol, timeframe=self.timeframe, limit=100)
-                df = pd.DataFrame(ohlcv, columns=['ts', 'open', 'high', 'low', 'close', 'vol'])
-                
-                # Cálculo manual de indicadores
-                df['rsi'] = self.calculate_rsi(df['close'])
-                df['atr'] = self.calculate_atr(df)
-                
-                if pd.isna(df['rsi'].iloc[-1]): continue
-
-                current_price = df['close'].iloc[-1]
-                current_rsi = df['rsi'].iloc[-1]
-                current_atr = df['atr'].iloc[-1]
-
-                print(f"📊 {symbol}: ${current_price} | RSI: {current_rsi:.2f}")
-
-                if symbol not in self.active_positions:
-                    if current_rsi < 35:
-                        balance = self.exchange.fetch_balance()
-                        mxn_disponible = balance['free'].get('MXN', 0)
-                        if mxn_disponible > 200:
-                            cantidad = self.get_precision_amount(symbol, 200 / current_price)
-                            self.exchange.create_market_buy_order(symbol, cantidad)
-                            self.active_positions[symbol] = {
-                                'amount': cantidad, 'buy_price': current_price,
-                                'stop_loss': current_price - (current_atr * 2),
-                                'take_profit': current_price + (current_atr * 3)
-                            }
-                            self.send_telegram(f"✅ COMPRA: {symbol} a ${current_price}")
-                else:
-                    pos = self.active_positions[symbol]
-                    if current_price <= pos['stop_loss'] or current_price >= pos['take_profit'] or current_rsi > 70:
-                        self.exchange.create_market_sell_order(symbol, pos['amount'])
-                        pnl = (current_price - pos['buy_price']) * pos['amount']
-                        self.send_telegram(f"💰 VENTA: {symbol}\nResultado: ${pnl:.2f} MXN")
-                        del self.active_positions[symbol]
-            except Exception as e:
-                logger.error(f"Error en {symbol}: {e}")
+            self.analyze_symbol(symbol)
+
+    def analyze_symbol(self, symbol):
+        if not self.is_market_open(symbol): return
+        logger.info(f"--- Analizando {symbol} ---")
+        try:
+            ohlcv = self.exchange.fetch_ohlcv(symbol, timeframe=self.timeframe, limit=100)
+            # Solo velas cerradas
+            ohlcv = drop_open_candle(ohlcv, self.timeframe, now=self.exchange.milliseconds() / 1000)
+            df = pd.DataFrame(ohlcv, columns=['ts', 'open', 'high', 'low', 'close', 'vol'])
+            
+            # Cálculo manual de indicadores
+            df['rsi'] = self.calculate_rsi(df['close'])
+            df['atr'] = self.calculate_atr(df)
+            
+            if pd.isna(df['rsi'].iloc[-1]): return
+
+            current_price = df['close'].iloc[-1]
+            current_rsi = df['rsi'].iloc[-1]
+            current_atr = df['atr'].iloc[-1]
+
+            print(f"📊 {symbol}: ${current_price} | RSI: {current_rsi:.2f}")
+            bus.publish('signal', symbol=symbol, price=float(current_price), rsi=float(current_rsi))
+
+            if symbol not in self.active_positions:
+                if current_rsi < 35:
+                    balance = self.exchange.fetch_balance()
+                    mxn_disponible = balance['free'].get('MXN', 0)
+                    if mxn_disponible > 200:
+                        cantidad = self.get_precision_amount(symbol, 200 / current_price)
+                        self.exchange.create_market_buy_order(symbol, cantidad)
+                        self.active_positions[symbol] = {
+                            'amount': cantidad, 'buy_price': current_price,
+                            'stop_loss': current_price - (current_atr * 2),
+                            'take_profit': current_price + (current_atr * 3)
+                        }
+                        self.send_telegram(f"✅ COMPRA: {symbol} a ${current_price}")
+                        bus.publish('position', symbol=symbol, side='buy', amount=cantidad, price=float(current_price))
+            else:
+                pos = self.active_positions[symbol]
+                if current_price <= pos['stop_loss'] or current_price >= pos['take_profit'] or current_rsi > 70:
+                    self.close_position(symbol, current_price)
+        except Exception as e:
+            logger.error(f"Error en {symbol}: {e}")
+
+    def check_exits(self, symbol):
+        """
+        Revisa stop loss / take profit contra el precio en vivo.
+        Las entradas esperan al cierre de vela, pero las salidas no pueden
+        esperar hasta 5 minutos: este trabajo corre con su propio intervalo.
+        """
+        if symbol not in self.active_positions or not self.is_market_open(symbol): return
+        try:
+            pos = self.active_positions[symbol]
+            current_price = self.exchange.fetch_ticker(symbol)['last']
+            if current_price <= pos['stop_loss'] or current_price >= pos['take_profit']:
+                self.close_position(symbol, current_price)
+        except Exception as e:
+            logger.error(f"Error revisando salida de {symbol}: {e}")
+
+    def close_position(self, symbol, current_price):
+        pos = self.active_positions[symbol]
+        self.exchange.create_market_sell_order(symbol, pos['amount'])
+        pnl = (current_price - pos['buy_price']) * pos['amount']
+        self.send_telegram(f"💰 VENTA: {symbol}\nResultado: ${pnl:.2f} MXN")
+        bus.publish('position', symbol=symbol, side='sell', amount=pos['amount'],
+                    price=float(current_price), pnl=float(pnl))
+        del self.active_positions[symbol]
 
 if __name__ == "__main__":
     bot = BitsoTradingBot('config_advanced.json')
-    while True:
-        bot.run_cycle()
-        time.sleep(60)
\ No newline at end of file
+    if bot.config.get('dashboard_port'):
+        try:
+            from dashboard import start_dashboard
+            start_dashboard(bot.symbols, port=bot.config['dashboard_port'])
+        except ImportError as e:
+            logger.warning(f"Dashboard desactivado, falta dependencia: {e.name}")
+    scheduler = CandleScheduler(bot.timeframe, settle_delay=bot.config.get('settle_delay', 2))
+    exit_timeframe = bot.config.get('exit_check_timeframe', '1m')
+    for symbol in bot.symbols:
+        # Entradas al cierre de vela (y una vez al arrancar); salidas con precio en vivo
+        scheduler.add_job(symbol, lambda s=symbol: bot.analyze_symbol(s), run_now=True)
+        scheduler.add_job(f"{symbol} salidas", lambda s=symbol: bot.check_exits(s), timeframe=exit_timeframe)
+
+    # kill (SIGTERM) sale igual que Ctrl-C, pasando por el finally
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        scheduler.run_forever()
+    except KeyboardInterrupt:
+        logger.info("Bot detenido por usuario")
+    finally:
+        bot.close()
\ No newline at end of file
@@ -110,7 +110,7 @@ def run_backtest(data_path, initial_cash=10000):
     returns = strat.analyzers.returns.get_analysis()
     drawdown = strat.analyzers.drawdown.get_analysis()
     
-    print(f'Ratio Sharpe: {sharpe.get("sharperatio", 0):.2f}')
+    print(f'Ratio Sharpe: {sharpe.get("sharperatio") or 0:.2f}')
     print(f'Drawdown máximo: {drawdown.max.drawdown:.2f}%')
     
     return strat
\ No newline at end of file
@@ -0,0 +1,259 @@
+# benchmark.py
+"""
+Benchmarks de las rutas críticas del bot, sin red ni credenciales.
+
+Uso:
+    python benchmark.py                 # compara contra benchmark_baseline.json
+    python benchmark.py --save          # guarda los resultados como nueva línea base
+    python benchmark.py --threshold 0.3 # tolerancia de regresión (30%)
+
+Cada benchmark guarda el mínimo y la mediana de sus muestras. Sale con
+código 1 si algún benchmark es más lento que la línea base por encima del
+umbral en ambas medidas, también tras volver a medirlo (--confirm veces),
+para que un pico de ruido no cuente como regresión. La línea base depende
+de la máquina, por eso no se versiona: créala con --save antes de empezar
+a optimizar.
+"""
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import pandas as pd
+
+from fake_exchange import FakeExchange, generate_candles
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+BASELINE_FILE = 'benchmark_baseline.json'
+BENCH_SYMBOLS = ['BTC/MXN', 'ETH/MXN', 'XRP/MXN', 'SOL/MXN']
+
+
+def measure(func, repeat=15, number=10):
+    """
+    Tiempo en segundos por llamada: mínimo (el menos afectado por ruido) y
+    mediana (lo típico) de `repeat` muestras de `number` llamadas.
+    """
+    func()  # Calentamiento
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        samples.append((time.perf_counter() - start) / number)
+    return {'min': min(samples), 'median': statistics.median(samples)}
+
+
+def candles_df(n=100, timeframe='5m'):
+    df = pd.DataFrame(generate_candles(n, timeframe), columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
+    df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+    return df.set_index('timestamp')
+
+
+def make_bitso_bot(exchange):
+    """BitsoTradingBot sin conexión real ni Telegram"""
+    from advanced_bot import BitsoTradingBot
+    bot = BitsoTradingBot.__new__(BitsoTradingBot)
+    bot.config = {}
+    bot.exchange = exchange
+    bot.telegram_token = None
+    bot.telegram_chat_id = None
+    bot.symbols = BENCH_SYMBOLS
+    bot.timeframe = '5m'
+    bot.active_positions = {}
+    return bot
+
+
+def make_core_bot():
+    """TradingBot sin llamar a load_markets"""
+    from bot_core import TradingBot
+    bot = TradingBot.__new__(TradingBot)
+    bot.exchange = FakeExchange()
+    bot.symbol = 'BTC/USDT'
+    bot.timeframe = '1h'
+    bot.logger = logging.getLogger('bot_core')
+    return bot
+
+
+def bench_bitso_indicators():
+    bot = make_bitso_bot(FakeExchange())
+    df = pd.DataFrame(generate_candles(100), columns=['ts', 'open', 'high', 'low', 'close', 'vol'])
+    return {
+        'calculate_rsi': measure(lambda: bot.calculate_rsi(df['close'])),
+        'calculate_atr': measure(lambda: bot.calculate_atr(df)),
+    }
+
+
+def bench_run_cycle():
+    exchange = FakeExchange()
+    for i, symbol in enumerate(BENCH_SYMBOLS):
+        exchange.candles[symbol] = generate_candles(100, '5m', seed=i)
+    bot = make_bitso_bot(exchange)
+
+    def cycle():
+        bot.active_positions = {}
+        with contextlib.redirect_stdout(io.StringIO()):
+            bot.run_cycle()
+
+    return {'run_cycle': measure(cycle)}
+
+
+def bench_core_signals():
+    bot = make_core_bot()
+    df = candles_df(100, '1h')
+    indicators = bot.calculate_indicators(df)
+    return {
+        'calculate_indicators': measure(lambda: bot.calculate_indicators(df)),
+        'generate_signals': measure(lambda: bot.generate_signals(indicators), number=100),
+    }
+
+
+def bench_position_size():
+    from risk_manager import RiskManager
+    risk = RiskManager(os.path.join(ROOT, 'config_advanced.json'))
+    risk.trade_results = [0.02, -0.01, 0.015, -0.005, 0.03, -0.02] * 8
+    return {'get_position_size': measure(lambda: risk.get_position_size(10000, 100.0, 1.5), number=500)}
+
+
+def bench_backtest():
+    from backtester import run_backtest
+    df = candles_df(1000, '1h')
+    with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as f:
+        df.to_csv(f, date_format='%Y-%m-%d %H:%M:%S')
+        path = f.name
+    try:
+        def backtest():
+            with contextlib.redirect_stdout(io.StringIO()):
+                run_backtest(path)
+        return {'run_backtest': measure(backtest, repeat=15, number=1)}
+    finally:
+        os.remove(path)
+
+
+BENCHMARKS = [
+    bench_bitso_indicators,
+    bench_run_cycle,
+    bench_core_signals,
+    bench_position_size,
+    bench_backtest,
+]
+
+
+def run_all(benchmarks=BENCHMARKS):
+    """Devuelve (resultados, benchmark que produjo cada resultado)"""
+    results, sources = {}, {}
+    for bench in benchmarks:
+        try:
+            measured = bench()
+        except ImportError as e:
+            print(f"⏭️  {bench.__name__} omitido, falta dependencia: {e.name}")
+            continue
+        results.update(measured)
+        sources.update((name, bench) for name in measured)
+    return results, sources
+
+
+def load_baseline(path=BASELINE_FILE):
+    if os.path.exists(path):
+        with open(path, 'r') as f:
+            return json.load(f)
+    return None
+
+
+def save_baseline(results, path=BASELINE_FILE):
+    with open(path, 'w') as f:
+        json.dump({'created': datetime.now().isoformat(timespec='seconds'), 'results': results}, f, indent=2)
+
+
+def as_stats(value):
+    """Líneas base antiguas guardaban solo el mínimo"""
+    return value if isinstance(value, dict) else {'min': value, 'median': value}
+
+
+def is_regression(stats, base, threshold):
+    """Más lento que la base en el mínimo y en la mediana"""
+    base = as_stats(base)
+    return all(stats[key] > base[key] * (1 + threshold) for key in ('min', 'median'))
+
+
+def confirm_regressions(names, results, sources, baseline, threshold, attempts):
+    """
+    Vuelve a medir los sospechosos y se queda con la mejor medición de cada
+    uno. Solo es regresión si sigue siéndolo en todas las mediciones.
+    """
+    reference = baseline['results']
+    for _ in range(attempts):
+        if not names:
+            break
+        for bench in {sources[name] for name in names}:
+            for name, stats in bench().items():
+                if name in names and stats['median'] < results[name]['median']:
+                    results[name] = stats
+        names = [name for name in names if is_regression(results[name], reference[name], threshold)]
+    return names
+
+
+def compare(results, baseline, threshold):
+    """Imprime la comparación y devuelve la lista de regresiones"""
+    regressions = []
+    reference = baseline['results'] if baseline else {}
+    for name, stats in results.items():
+        base = reference.get(name)
+        line = f"{name:<22} {stats['min'] * 1e6:>12.1f} µs  (mediana {stats['median'] * 1e6:.1f})"
+        if base:
+            change = stats['median'] / as_stats(base)['median'] - 1
+            line += f"  ({change:+.1%} vs base)"
+            if is_regression(stats, base, threshold):
+                regressions.append(name)
+                line += "  ❌ REGRESIÓN"
+        print(line)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks del bot de trading')
+    parser.add_argument('--save', action='store_true', help='Guardar resultados como línea base')
+    parser.add_argument('--threshold', type=float, default=0.25, help='Regresión máxima tolerada (0.25 = 25%%)')
+    parser.add_argument('--baseline', default=BASELINE_FILE)
+    parser.add_argument('--confirm', type=int, default=2, help='Veces que se vuelve a medir una posible regresión')
+    args = parser.parse_args()
+
+    # Silenciar logs de los bots durante la medición
+    logging.disable(logging.CRITICAL)
+
+    results, sources = run_all()
+    baseline = load_baseline(args.baseline)
+
+    print("=" * 50)
+    print("BENCHMARKS")
+    print("=" * 50)
+    regressions = compare(results, baseline, args.threshold)
+    if regressions and not args.save:
+        print(f"\n🔁 Volviendo a medir: {', '.join(regressions)}")
+        regressions = confirm_regressions(regressions, results, sources, baseline, args.threshold, args.confirm)
+        if regressions:
+            compare({name: results[name] for name in regressions}, baseline, args.threshold)
+
+    if args.save:
+        save_baseline(results, args.baseline)
+        print(f"\n💾 Línea base guardada en {args.baseline}")
+        return 0
+
+    if baseline is None:
+        print("\nSin línea base. Ejecuta con --save para crearla.")
+    elif regressions:
+        print(f"\n❌ Regresiones > {args.threshold:.0%}: {', '.join(regressions)}")
+        return 1
+    else:
+        print("\n✅ Sin regresiones")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
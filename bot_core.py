@@ -8,6 +8,9 @@ import time
 import logging
 from typing import Dict, List, Optional
 import json
+from scheduler import CandleScheduler, drop_open_candle
+from event_bus import bus
+from resilient_exchange import ResilientExchange
 
 class TradingBot:
     def __init__(self, exchange_id: str = 'binance'):
@@ -39,6 +42,9 @@ class TradingBot:
             'options': {'defaultType': 'spot'}
         })
         
+        # Reintentos, idempotencia de órdenes y circuit breaker
+        exchange = ResilientExchange(exchange)
+        
         # Verificar conectividad
         try:
             exchange.load_markets()
@@ -56,6 +62,8 @@ class TradingBot:
                 timeframe=self.timeframe,
                 limit=limit
             )
+            # Descartar la vela en curso: las señales usan solo velas cerradas
+            ohlcv = drop_open_candle(ohlcv, self.timeframe, now=self.exchange.milliseconds() / 1000)
             
             df = pd.DataFrame(
                 ohlcv,
@@ -174,43 +182,57 @@ class TradingBot:
         
         return risk_params
     
-    def run(self):
+    def run_iteration(self):
+        """Una iteración del bot, disparada al cierre de cada vela"""
+        # 1. Obtener datos del mercado
+        df = self.fetch_ohlcv(limit=100)
+        if df is None:
+            return
+        
+        # 2. Calcular indicadores
+        df = self.calculate_indicators(df)
+        
+        # 3. Generar señales
+        signals = self.generate_signals(df)
+        latest = df.iloc[-1]
+        bus.publish('signal', symbol=self.symbol, price=float(latest['close']),
+                    rsi=float(latest['rsi']), strength=signals['strength'])
+        
+        # 4. Gestión de riesgo
+        risk = self.risk_management(df)
+        
+        # 5. Ejecutar lógica de trading
+        if signals['buy'] and signals['strength'] > 1:
+            self.logger.info(f"Señal COMPRA: {signals['reasons']}")
+            # Aquí implementar lógica de ejecución real
+        
+        elif signals['sell'] and signals['strength'] > 1:
+            self.logger.info(f"Señal VENTA: {signals['reasons']}")
+            # Aquí implementar lógica de ejecución real
+    
+    def run(self, settle_delay: float = 2.0):
         """Bucle principal del bot"""
         self.is_running = True
         self.logger.info("Iniciando bot de trading...")
         
-        while self.is_running:
-            try:
-                # 1. Obtener datos del mercado
-                df = self.fetch_ohlcv(limit=100)
-                if df is None:
-                    time.sleep(60)
-                    continue
-                
-                # 2. Calcular indicadores
-                df = self.calculate_indicators(df)
-                
-                # 3. Generar señales
-                signals = self.generate_signals(df)
-                
-                # 4. Gestión de riesgo
-                risk = self.risk_management(df)
-                
-                # 5. Ejecutar lógica de trading
-                if signals['buy'] and signals['strength'] > 1:
-                    self.logger.info(f"Señal COMPRA: {signals['reasons']}")
-                    # Aquí implementar lógica de ejecución real
-                
-                elif signals['sell'] and signals['strength'] > 1:
-                    self.logger.info(f"Señal VENTA: {signals['reasons']}")
-                    # Aquí implementar lógica de ejecución real
-                
-                # 6. Esperar para siguiente iteración
-                time.sleep(300)  # 5 minutos entre checks
-                
-            except KeyboardInterrupt:
-                self.logger.info("Bot detenido por usuario")
-                self.is_running = False
-            except Exception as e:
-                self.logger.error(f"Error en bucle principal: {e}")
-                time.sleep(60)
\ No newline at end of file
+        # 6. Una iteración al arrancar; después cada una se alinea al cierre
+        # de vela del timeframe, sin acumular deriva entre ciclos
+        self.scheduler = CandleScheduler(self.timeframe, settle_delay=settle_delay)
+        self.scheduler.add_job(self.symbol, self.run_iteration, run_now=True)
+        
+        try:
+            self.scheduler.run_forever()
+        except KeyboardInterrupt:
+            self.logger.info("Bot detenido por usuario")
+        finally:
+            self.is_running = False
+            stats = self.scheduler.stats()[self.symbol]
+            self.logger.info(
+                f"Ciclos: {stats['runs']}, saltados: {stats['skipped']}, "
+                f"lag máximo: {stats['max_lag']:.2f}s"
+            )
+    
+    def stop(self):
+        self.is_running = False
+        if getattr(self, 'scheduler', None):
+            self.scheduler.stop()
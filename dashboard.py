@@ -0,0 +1,210 @@
+# dashboard.py
+"""
+Dashboard en vivo alimentado por el bus de eventos del bot (sin leer logs).
+
+Un hilo consume los eventos del bus y los agrega en series temporales
+acotadas (ring buffers por buckets de tiempo). El navegador solo recibe los
+puntos nuevos vía extendData, nunca la figura completa.
+
+Uso dentro del bot: "dashboard_port": 8050 en config_advanced.json
+"""
+import logging
+import threading
+import time
+from collections import deque
+
+import dash_bootstrap_components as dbc
+import plotly.graph_objects as go
+from dash import Dash, Input, Output, State, dcc, html, no_update
+
+from event_bus import bus as default_bus
+
+logger = logging.getLogger("Dashboard")
+
+
+class RingSeries:
+    """
+    Serie temporal acotada y submuestreada.
+    Los valores se agrupan en buckets de `resolution` segundos; solo los
+    buckets cerrados se publican, cada uno con un número de secuencia para
+    que el cliente pida únicamente lo que no ha visto.
+    """
+
+    AGGREGATORS = {
+        'last': lambda values: values[-1],
+        'mean': lambda values: sum(values) / len(values),
+        'max': max,
+    }
+
+    def __init__(self, capacity=2000, resolution=1.0, agg='last'):
+        self.points = deque(maxlen=capacity)  # (seq, t, valor)
+        self.resolution = resolution
+        self.aggregate = self.AGGREGATORS[agg]
+        self.seq = 0
+        self.bucket_start = None
+        self.bucket_values = []
+        self.last_closed = None
+
+    def add(self, t, value):
+        start = t - t % self.resolution
+        # Un evento tardío cae en el siguiente bucket abierto, no en uno ya publicado
+        if self.last_closed is not None and start <= self.last_closed:
+            start = self.last_closed + self.resolution
+        if self.bucket_start is not None and start != self.bucket_start:
+            self._close_bucket()
+        self.bucket_start = start
+        self.bucket_values.append(value)
+
+    def _close_bucket(self):
+        self.seq += 1
+        self.points.append((self.seq, self.bucket_start, self.aggregate(self.bucket_values)))
+        self.last_closed = self.bucket_start
+        self.bucket_start = None
+        self.bucket_values = []
+
+    def since(self, cursor, now=None):
+        """Puntos cerrados con secuencia mayor que `cursor`"""
+        now = time.time() if now is None else now
+        if self.bucket_start is not None and now >= self.bucket_start + self.resolution:
+            self._close_bucket()
+        return [p for p in self.points if p[0] > cursor]
+
+
+class DashboardState:
+    """Estado agregado a partir de los eventos del bus"""
+
+    def __init__(self, symbols, event_bus=None, capacity=2000, resolution=1.0):
+        self.symbols = list(symbols)
+        self.capacity = capacity
+        self.lock = threading.Lock()
+        self.subscription = (event_bus or default_bus).subscribe()
+        self.prices = {s: RingSeries(capacity, resolution, 'last') for s in self.symbols}
+        self.rsi = {s: RingSeries(capacity, resolution, 'last') for s in self.symbols}
+        self.pnl = RingSeries(capacity, resolution, 'last')
+        self.lag = RingSeries(capacity, resolution, 'max')
+        self.duration = RingSeries(capacity, resolution, 'max')
+        self.positions = {}
+        self.signals = deque(maxlen=20)
+        self.total_pnl = 0.0
+
+    def consume(self):
+        """Vacía la suscripción y actualiza las series"""
+        events = self.subscription.drain()
+        if not events:
+            return
+        with self.lock:
+            for t, topic, data in events:
+                handler = getattr(self, f"_on_{topic}", None)
+                if handler:
+                    handler(t, data)
+
+    def _on_signal(self, t, data):
+        symbol = data['symbol']
+        if symbol in self.prices:
+            self.prices[symbol].add(t, data['price'])
+            if data.get('rsi') is not None:
+                self.rsi[symbol].add(t, data['rsi'])
+        self.signals.append((t, data))
+
+    def _on_position(self, t, data):
+        if data['side'] == 'buy':
+            self.positions[data['symbol']] = data
+        else:
+            self.positions.pop(data['symbol'], None)
+            self.total_pnl += data.get('pnl', 0.0)
+            self.pnl.add(t, self.total_pnl)
+
+    def _on_cycle(self, t, data):
+        self.lag.add(t, data['lag'])
+        self.duration.add(t, data['duration'])
+
+    def deltas(self, series_list, cursors, now=None):
+        """
+        Construye el payload de extendData para las series dadas.
+        Devuelve (payload o None, cursores nuevos).
+        """
+        xs, ys, new_cursors = [], [], []
+        with self.lock:
+            for series, cursor in zip(series_list, cursors):
+                points = series.since(cursor, now)
+                xs.append([time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(p[1])) for p in points])
+                ys.append([p[2] for p in points])
+                new_cursors.append(points[-1][0] if points else cursor)
+        if not any(xs):
+            return None, new_cursors
+        return (dict(x=xs, y=ys), list(range(len(series_list))), self.capacity), new_cursors
+
+    def run_consumer(self, interval=0.5):
+        """Hilo consumidor: mantiene las series al día aunque nadie mire el dashboard"""
+        def loop():
+            while True:
+                self.consume()
+                time.sleep(interval)
+        thread = threading.Thread(target=loop, name="dashboard-consumer", daemon=True)
+        thread.start()
+        return thread
+
+
+def empty_figure(title, names):
+    fig = go.Figure([go.Scatter(x=[], y=[], mode='lines', name=name) for name in names])
+    fig.update_layout(title=title, template='plotly_dark', margin=dict(l=40, r=20, t=40, b=30), height=300)
+    return fig
+
+
+def create_app(state, refresh_ms=1000):
+    app = Dash(__name__, external_stylesheets=[dbc.themes.DARKLY])
+    graphs = {
+        'price': ("Precio", state.symbols, [state.prices[s] for s in state.symbols]),
+        'rsi': ("RSI", state.symbols, [state.rsi[s] for s in state.symbols]),
+        'pnl': ("P&L acumulado", ['P&L'], [state.pnl]),
+        'latency': ("Latencia del ciclo (s)", ['Lag', 'Duración'], [state.lag, state.duration]),
+    }
+
+    app.layout = dbc.Container([
+        html.H3("Bot Bitso - Monitor en vivo"),
+        dbc.Row([dbc.Col(dcc.Graph(id=f"graph-{key}", figure=empty_figure(title, names)), md=6)
+                 for key, (title, names, _) in graphs.items()]),
+        dbc.Row([
+            dbc.Col([html.H5("Posiciones abiertas"), html.Div(id='positions')], md=6),
+            dbc.Col([html.H5("Últimas señales"), html.Div(id='signals')], md=6),
+        ]),
+        dcc.Store(id='cursors', data={key: [0] * len(series) for key, (_, _, series) in graphs.items()}),
+        dcc.Interval(id='refresh', interval=refresh_ms),
+    ], fluid=True)
+
+    @app.callback(
+        [Output(f"graph-{key}", 'extendData') for key in graphs]
+        + [Output('cursors', 'data'), Output('positions', 'children'), Output('signals', 'children')],
+        Input('refresh', 'n_intervals'),
+        State('cursors', 'data'),
+    )
+    def push_deltas(_, cursors):
+        outputs = []
+        for key, (_, _, series) in graphs.items():
+            payload, cursors[key] = state.deltas(series, cursors[key])
+            outputs.append(payload if payload else no_update)
+
+        with state.lock:
+            positions = [html.Div(f"{s}: {p['amount']} @ ${p['price']:.2f}") for s, p in state.positions.items()]
+            signals = [html.Div(f"{time.strftime('%H:%M:%S', time.localtime(t))} {d['symbol']} "
+                                f"${d['price']:.2f} RSI {d.get('rsi') or 0:.1f}")
+                       for t, d in reversed(state.signals)]
+        return outputs + [cursors, positions or "Sin posiciones", signals]
+
+    return app
+
+
+def start_dashboard(symbols, port=8050, host='127.0.0.1', event_bus=None):
+    """Arranca el dashboard en un hilo daemon dentro del proceso del bot"""
+    state = DashboardState(symbols, event_bus)
+    state.run_consumer()
+    app = create_app(state)
+    # Sin logs por cada petición del navegador en la salida del bot
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    thread = threading.Thread(
+        target=app.run, kwargs={'host': host, 'port': port, 'debug': False},
+        name="dashboard-server", daemon=True
+    )
+    thread.start()
+    logger.info(f"Dashboard en http://{host}:{port}")
+    return state
@@ -0,0 +1,52 @@
+# event_bus.py
+import time
+from collections import deque
+
+
+class Subscription:
+    """Cola acotada de eventos para un consumidor (descarta los más viejos si se llena)"""
+
+    def __init__(self, maxlen=10000):
+        self.queue = deque(maxlen=maxlen)
+
+    def drain(self):
+        """Saca todos los eventos pendientes como lista de (timestamp, tema, datos)"""
+        events = []
+        while True:
+            try:
+                events.append(self.queue.popleft())
+            except IndexError:
+                return events
+
+
+class EventBus:
+    """
+    Bus de eventos en proceso para métricas del bot.
+
+    publish() solo hace un append O(1) a la cola de cada suscriptor, sin
+    locks ni E/S, así que el bucle de trading no paga por el monitoreo.
+    Sin suscriptores, publicar no hace nada.
+    """
+
+    def __init__(self):
+        self.subscribers = []
+
+    def subscribe(self, maxlen=10000):
+        subscription = Subscription(maxlen)
+        self.subscribers.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        if subscription in self.subscribers:
+            self.subscribers.remove(subscription)
+
+    def publish(self, topic, **data):
+        if not self.subscribers:
+            return
+        event = (time.time(), topic, data)
+        for subscription in self.subscribers:
+            subscription.queue.append(event)
+
+
+# Bus compartido por el bot, el planificador y el dashboard
+bus = EventBus()
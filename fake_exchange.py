@@ -0,0 +1,197 @@
+# fake_exchange.py
+import time
+from collections import deque
+
+import ccxt
+import numpy as np
+
+from scheduler import timeframe_to_seconds
+
+
+def generate_candles(n=100, timeframe='5m', start_price=100.0, volatility=0.002, seed=42, end=None):
+    """
+    Genera velas OHLCV sintéticas (caminata aleatoria geométrica).
+    Formato ccxt: [timestamp_ms, open, high, low, close, volume].
+    La última vela termina en el último cierre anterior a `end`.
+    """
+    rng = np.random.default_rng(seed)
+    period = timeframe_to_seconds(timeframe)
+    end = time.time() if end is None else end
+    last_open = (int(end) // period - 1) * period
+
+    closes = start_price * np.exp(np.cumsum(rng.normal(0, volatility, n)))
+    opens = np.concatenate(([start_price], closes[:-1]))
+    spread = np.abs(rng.normal(0, volatility, n)) * closes
+    highs = np.maximum(opens, closes) + spread
+    lows = np.minimum(opens, closes) - spread
+    volumes = rng.uniform(1, 100, n)
+    timestamps = (last_open - period * np.arange(n - 1, -1, -1)) * 1000
+
+    return np.column_stack([timestamps, opens, highs, lows, closes, volumes]).tolist()
+
+
+class FakeExchange:
+    """
+    Exchange en memoria con la misma interfaz ccxt que usan los bots.
+    Sirve para benchmarks y pruebas sin red.
+    """
+
+    # Nombres del client order id según el exchange (ver CLIENT_ID_PARAMS)
+    CLIENT_ID_PARAMS = ('clientOrderId', 'client_id')
+
+    def __init__(self, candles=None, balance=None, precision=8, id=None, has=None):
+        self.candles = candles or {}
+        self.balance = balance or {'free': {'MXN': 10000.0, 'USDT': 10000.0}, 'total': {'MXN': 10000.0, 'USDT': 10000.0}}
+        self.precision = precision
+        self.orders = []
+        self.trades = []
+        if id is not None:
+            self.id = id
+        if has is not None:
+            self.has = has
+
+    def milliseconds(self):
+        return int(time.time() * 1000)
+
+    def _candles(self, symbol, timeframe, limit):
+        if symbol not in self.candles:
+            self.candles[symbol] = generate_candles(limit, timeframe)
+        return self.candles[symbol][-limit:]
+
+    def fetch_ohlcv(self, symbol, timeframe='5m', limit=100):
+        return self._candles(symbol, timeframe, limit)
+
+    def fetch_ticker(self, symbol):
+        last = self._candles(symbol, '5m', 1)[-1][4]
+        return {'symbol': symbol, 'last': last, 'bid': last, 'ask': last}
+
+    def fetch_balance(self):
+        return self.balance
+
+    def market(self, symbol):
+        return {'symbol': symbol, 'precision': {'amount': self.precision}}
+
+    def load_markets(self):
+        return {symbol: self.market(symbol) for symbol in self.candles}
+
+    def fetch_open_orders(self, symbol=None):
+        return []  # Las órdenes de mercado se llenan al instante
+
+    def fetch_closed_orders(self, symbol=None):
+        return [o for o in self.orders if symbol is None or o['symbol'] == symbol]
+
+    def fetch_order(self, id, symbol=None):
+        for order in self.orders:
+            if order['id'] == id:
+                return order
+        raise ccxt.OrderNotFound(f"orden {id} no existe")
+
+    def fetch_my_trades(self, symbol=None, since=None, limit=None, params=None):
+        # Igual que ccxt con Bitso: `since` solo se acepta junto con un `marker`
+        if getattr(self, 'id', None) == 'bitso' and since is not None and 'marker' not in (params or {}):
+            raise ccxt.ExchangeError("bitso fetchMyTrades() does not support fetching trades starting from a timestamp")
+        trades = [t for t in self.trades
+                  if (symbol is None or t['symbol'] == symbol) and (since is None or t['timestamp'] >= since)]
+        return trades[-limit:] if limit else trades
+
+    def create_order(self, symbol, type, side, amount, price=None, params=None):
+        params = params or {}
+        client_id = next((params[name] for name in self.CLIENT_ID_PARAMS if params.get(name)), None)
+        # Igual que un exchange real: rechaza client ids repetidos
+        if client_id and any(o['clientOrderId'] == client_id for o in self.orders):
+            raise ccxt.DuplicateOrderId(f"clientOrderId {client_id} ya existe")
+        timestamp = self.milliseconds()
+        fill_price = price or self._candles(symbol, '5m', 1)[-1][4]
+        order = {
+            'id': str(len(self.orders) + 1),
+            'clientOrderId': client_id,
+            'timestamp': timestamp,
+            'symbol': symbol, 'type': type, 'side': side,
+            'amount': amount, 'price': price, 'filled': amount, 'status': 'closed'
+        }
+        self.orders.append(order)
+        # Las órdenes de mercado se llenan al instante con una sola ejecución
+        self.trades.append({
+            'id': str(len(self.trades) + 1), 'order': order['id'], 'timestamp': timestamp,
+            'symbol': symbol, 'side': side, 'amount': amount, 'price': fill_price
+        })
+        return order
+
+    def create_market_buy_order(self, symbol, amount, params=None):
+        return self.create_order(symbol, 'market', 'buy', amount, params=params)
+
+    def create_market_sell_order(self, symbol, amount, params=None):
+        return self.create_order(symbol, 'market', 'sell', amount, params=params)
+
+
+class FaultyExchange(FakeExchange):
+    """
+    FakeExchange con inyección de fallos para probar la resiliencia del cliente.
+
+    `script` define los fallos por método en orden de llamada, p. ej.
+    {'fetch_ohlcv': ['timeout', None, 'down'], 'create_order': ['timeout_after_fill']}:
+      'timeout'            -> ccxt.RequestTimeout
+      'down'               -> ccxt.ExchangeNotAvailable
+      'slow'               -> responde tras `slow_latency` segundos
+      'timeout_after_fill' -> la orden se ejecuta pero la respuesta se pierde
+    Sin script, cada llamada falla con probabilidad `failure_rate`.
+    """
+
+    def __init__(self, *args, script=None, failure_rate=0.0, slow_latency=0.5, seed=0, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.script = {method: deque(faults) for method, faults in (script or {}).items()}
+        self.failure_rate = failure_rate
+        self.slow_latency = slow_latency
+        self.rng = np.random.default_rng(seed)
+        self.calls = {}
+
+    def _fault(self, method):
+        self.calls[method] = self.calls.get(method, 0) + 1
+        queue = self.script.get(method)
+        if queue:
+            fault = queue.popleft()
+        else:
+            fault = 'down' if self.rng.random() < self.failure_rate else None
+
+        if fault == 'timeout':
+            raise ccxt.RequestTimeout(f"{method}: timeout simulado")
+        if fault == 'down':
+            raise ccxt.ExchangeNotAvailable(f"{method}: exchange caído (simulado)")
+        if fault == 'slow':
+            time.sleep(self.slow_latency)
+        return fault
+
+    def fetch_ohlcv(self, symbol, timeframe='5m', limit=100):
+        self._fault('fetch_ohlcv')
+        return super().fetch_ohlcv(symbol, timeframe, limit)
+
+    def fetch_ticker(self, symbol):
+        self._fault('fetch_ticker')
+        return super().fetch_ticker(symbol)
+
+    def fetch_balance(self):
+        self._fault('fetch_balance')
+        return super().fetch_balance()
+
+    def fetch_open_orders(self, symbol=None):
+        self._fault('fetch_open_orders')
+        return super().fetch_open_orders(symbol)
+
+    def fetch_closed_orders(self, symbol=None):
+        self._fault('fetch_closed_orders')
+        return super().fetch_closed_orders(symbol)
+
+    def fetch_order(self, id, symbol=None):
+        self._fault('fetch_order')
+        return super().fetch_order(id, symbol)
+
+    def fetch_my_trades(self, symbol=None, since=None, limit=None, params=None):
+        self._fault('fetch_my_trades')
+        return super().fetch_my_trades(symbol, since, limit, params)
+
+    def create_order(self, symbol, type, side, amount, price=None, params=None):
+        fault = self._fault('create_order')
+        order = super().create_order(symbol, type, side, amount, price, params)
+        if fault == 'timeout_after_fill':
+            raise ccxt.RequestTimeout("create_order: respuesta perdida tras ejecutar la orden")
+        return order
@@ -0,0 +1,253 @@
+# monte_carlo.py
+"""
+Simulador Monte Carlo de robustez para el historial de trades y el sizing Kelly/ATR.
+
+Remuestrea (bootstrap por bloques) las secuencias de retornos de trades y,
+opcionalmente, trayectorias de velas para obtener la volatilidad (ATR) de
+cada trade. Sobre cada trayectoria reproduce la misma lógica de
+RiskManager.calculate_dynamic_kelly / get_position_size, vectorizada en
+NumPy, y reporta distribuciones de drawdown y probabilidad de ruina.
+
+Uso:
+    python monte_carlo.py --paths 100000 --trades 200 --block 5
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+KELLY_WINDOW = 50      # RiskManager solo guarda los últimos 50 trades
+KELLY_MIN_TRADES = 5   # Mínimo de trades antes de calcular Kelly
+KELLY_FRACTION = 0.25  # Fractional Kelly
+PERCENTILES = [5, 25, 50, 75, 95]
+
+
+def block_indices(rng, n_obs, n_paths, length, block_size=1):
+    """
+    Índices para bootstrap circular por bloques.
+    Con block_size=1 es un bootstrap i.i.d.; bloques mayores conservan
+    las rachas (autocorrelación) de la serie original.
+    """
+    n_blocks = -(-length // block_size)
+    starts = rng.integers(0, n_obs, size=(n_paths, n_blocks))
+    idx = (starts[:, :, None] + np.arange(block_size)) % n_obs
+    return idx.reshape(n_paths, -1)[:, :length]
+
+
+def resample_atr_pct(rng, ohlcv, n_paths, length, block_size=1, period=14):
+    """
+    Reconstruye trayectorias de velas remuestreando barras por bloques
+    y devuelve el ATR relativo al precio (ATR / close) para cada paso.
+    """
+    candles = np.asarray(ohlcv, dtype=float)
+    high, low, close = candles[:, 2], candles[:, 3], candles[:, 4]
+    log_ret = np.diff(np.log(close))
+    high_rel = high[1:] / close[1:]
+    low_rel = low[1:] / close[1:]
+
+    idx = block_indices(rng, len(log_ret), n_paths, length + period, block_size)
+    paths_close = np.exp(np.cumsum(log_ret[idx], axis=1))
+    paths_high = paths_close * high_rel[idx]
+    paths_low = paths_close * low_rel[idx]
+    prev_close = np.concatenate((np.ones((n_paths, 1)), paths_close[:, :-1]), axis=1)
+
+    true_range = np.maximum.reduce([
+        paths_high - paths_low,
+        np.abs(paths_high - prev_close),
+        np.abs(paths_low - prev_close),
+    ])
+    # Media móvil del True Range (igual que calculate_atr) vía suma acumulada
+    csum = np.cumsum(true_range, axis=1)
+    atr = (csum[:, period:] - csum[:, :-period]) / period
+    return atr / paths_close[:, period:]
+
+
+def rolling_kelly(history, sim_returns, max_position_size=0.1, max_kelly=0.25):
+    """
+    Kelly dinámico para cada trade simulado, usando como ventana los
+    KELLY_WINDOW trades anteriores (historial real + simulados),
+    exactamente como RiskManager.calculate_dynamic_kelly.
+    """
+    n_paths, n_trades = sim_returns.shape
+    history = np.asarray(history, dtype=float)[-KELLY_WINDOW:]
+    all_returns = np.concatenate((np.broadcast_to(history, (n_paths, len(history))), sim_returns), axis=1)
+
+    wins = all_returns > 0
+    zeros = np.zeros((n_paths, 1))
+    cum_wins = np.concatenate((zeros, np.cumsum(wins, axis=1)), axis=1)
+    cum_win_sum = np.concatenate((zeros, np.cumsum(np.where(wins, all_returns, 0.0), axis=1)), axis=1)
+    cum_loss_sum = np.concatenate((zeros, np.cumsum(np.where(wins, 0.0, all_returns), axis=1)), axis=1)
+
+    # La ventana del trade t es [max(0, end - 50), end) con end = len(history) + t
+    end = len(history) + np.arange(n_trades)
+    start = np.maximum(0, end - KELLY_WINDOW)
+    count = (end - start).astype(float)
+    n_wins = cum_wins[:, end] - cum_wins[:, start]
+    n_losses = count - n_wins
+    win_sum = cum_win_sum[:, end] - cum_win_sum[:, start]
+    loss_sum = cum_loss_sum[:, end] - cum_loss_sum[:, start]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        avg_win = np.where(n_wins > 0, win_sum / n_wins, 0.01)
+        avg_loss = np.where(n_losses > 0, np.abs(loss_sum / n_losses), 0.01)
+        ratio = avg_win / avg_loss
+        kelly = (n_wins / count) - ((1 - n_wins / count) / ratio)
+    kelly = np.nan_to_num(kelly, nan=0.0, posinf=1.0, neginf=0.0)
+
+    safe_kelly = np.clip(kelly * KELLY_FRACTION, 0.01, max_kelly)
+    return np.where(count < KELLY_MIN_TRADES, max_position_size / 2, safe_kelly)
+
+
+def simulate_chunk(args):
+    """Simula un bloque de trayectorias. Se ejecuta en un proceso del pool."""
+    (seed, n_paths, trade_returns, ohlcv, params) = args
+    rng = np.random.default_rng(seed)
+    returns = np.asarray(trade_returns, dtype=float)
+    n_trades = params['n_trades']
+
+    idx = block_indices(rng, len(returns), n_paths, n_trades, params['block_size'])
+    sim_returns = returns[idx]
+
+    if ohlcv is not None:
+        atr_pct = resample_atr_pct(rng, ohlcv, n_paths, n_trades, params['block_size'], params['atr_period'])
+    else:
+        atr_pct = np.full((n_paths, n_trades), params['atr_pct'])
+
+    kelly = rolling_kelly(returns if params['seed_history'] else [], sim_returns,
+                          params['max_position_size'], params['max_kelly'])
+
+    # get_position_size: valor = balance * kelly / (2 * ATR) * precio
+    # => fracción del capital = kelly / (2 * ATR%), limitada por el apalancamiento
+    with np.errstate(divide='ignore'):
+        exposure = np.where(atr_pct > 0, kelly / (2 * atr_pct), 0.0)
+    exposure = np.minimum(exposure, params['max_leverage'])
+
+    growth = np.maximum(1 + exposure * sim_returns, 0.0)
+    equity = np.cumprod(growth, axis=1)
+    peak = np.maximum.accumulate(np.concatenate((np.ones((n_paths, 1)), equity), axis=1), axis=1)[:, 1:]
+    max_drawdown = np.max(1 - equity / peak, axis=1)
+    ruined = np.min(equity, axis=1) <= 1 - params['ruin_threshold']
+
+    return {
+        'final_equity': equity[:, -1],
+        'max_drawdown': max_drawdown,
+        'ruined': ruined,
+        'mean_kelly': kelly.mean(axis=1),
+        'mean_exposure': exposure.mean(axis=1),
+    }
+
+
+def run_simulation(trade_returns, n_paths=100000, n_trades=200, block_size=1, ohlcv=None,
+                   atr_pct=0.01, atr_period=14, max_position_size=0.1, max_kelly=0.25,
+                   max_leverage=1.0, ruin_threshold=0.5, max_drawdown=0.15,
+                   seed_history=True, workers=None, chunk_size=10000, seed=None):
+    """
+    Ejecuta el estudio Monte Carlo repartiendo las trayectorias en bloques
+    entre varios procesos. Devuelve un resumen con percentiles de drawdown,
+    capital final y probabilidad de ruina.
+    """
+    if len(trade_returns) < KELLY_MIN_TRADES:
+        raise ValueError(f"Se necesitan al menos {KELLY_MIN_TRADES} trades, hay {len(trade_returns)}")
+
+    params = {
+        'n_trades': n_trades,
+        'block_size': block_size,
+        'atr_pct': atr_pct,
+        'atr_period': atr_period,
+        'max_position_size': max_position_size,
+        'max_kelly': max_kelly,
+        'max_leverage': max_leverage,
+        'ruin_threshold': ruin_threshold,
+        'seed_history': seed_history,
+    }
+    sizes = [chunk_size] * (n_paths // chunk_size)
+    if n_paths % chunk_size:
+        sizes.append(n_paths % chunk_size)
+    # Semillas independientes por bloque: resultados reproducibles en paralelo
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    tasks = [(s, size, list(trade_returns), ohlcv, params) for s, size in zip(seeds, sizes)]
+
+    start = time.perf_counter()
+    if workers == 1 or len(tasks) == 1:
+        chunks = [simulate_chunk(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            chunks = list(pool.map(simulate_chunk, tasks))
+    elapsed = time.perf_counter() - start
+
+    results = {key: np.concatenate([c[key] for c in chunks]) for key in chunks[0]}
+    return summarize(results, max_drawdown, n_paths, n_trades, elapsed)
+
+
+def summarize(results, max_drawdown, n_paths, n_trades, elapsed):
+    dd = results['max_drawdown']
+    final = results['final_equity']
+    return {
+        'paths': n_paths,
+        'trades_per_path': n_trades,
+        'elapsed_seconds': elapsed,
+        'prob_ruin': float(results['ruined'].mean()),
+        'prob_drawdown_over_limit': float((dd > max_drawdown).mean()),
+        'max_drawdown_pct': {p: float(v) for p, v in zip(PERCENTILES, np.percentile(dd, PERCENTILES))},
+        'final_equity_pct': {p: float(v) for p, v in zip(PERCENTILES, np.percentile(final, PERCENTILES))},
+        'mean_kelly': float(results['mean_kelly'].mean()),
+        'mean_exposure': float(results['mean_exposure'].mean()),
+    }
+
+
+def print_report(summary, max_drawdown):
+    print('=' * 50)
+    print('MONTE CARLO - ROBUSTEZ KELLY/ATR')
+    print('=' * 50)
+    print(f"Trayectorias: {summary['paths']} x {summary['trades_per_path']} trades "
+          f"({summary['elapsed_seconds']:.2f}s)")
+    print(f"Kelly medio: {summary['mean_kelly']:.2%} | Exposición media: {summary['mean_exposure']:.2%}")
+    print(f"Probabilidad de ruina: {summary['prob_ruin']:.2%}")
+    print(f"Prob. drawdown > {max_drawdown:.0%}: {summary['prob_drawdown_over_limit']:.2%}")
+    print("Percentil   Drawdown máx.   Capital final")
+    for p in PERCENTILES:
+        print(f"  P{p:<8} {summary['max_drawdown_pct'][p]:>12.2%} {summary['final_equity_pct'][p]:>14.3f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Monte Carlo de robustez del sizing Kelly/ATR')
+    parser.add_argument('--config', default='config_advanced.json')
+    parser.add_argument('--history', default='data/trade_history.json')
+    parser.add_argument('--candles', help='JSON con velas OHLCV (formato ccxt) para remuestrear el ATR')
+    parser.add_argument('--paths', type=int, default=100000)
+    parser.add_argument('--trades', type=int, default=200)
+    parser.add_argument('--block', type=int, default=1, help='Tamaño de bloque del bootstrap')
+    parser.add_argument('--atr-pct', type=float, default=0.01, help='ATR/precio fijo si no hay velas')
+    parser.add_argument('--ruin', type=float, default=0.5, help='Pérdida del capital considerada ruina')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    with open(args.config, 'r') as f:
+        config = json.load(f).get('risk_management', {})
+    if not os.path.exists(args.history):
+        raise SystemExit(f"No existe el historial de trades: {args.history}")
+    with open(args.history, 'r') as f:
+        trade_returns = json.load(f)
+    ohlcv = None
+    if args.candles:
+        with open(args.candles, 'r') as f:
+            ohlcv = json.load(f)
+
+    max_drawdown = config.get('max_drawdown', 0.15)
+    summary = run_simulation(
+        trade_returns, n_paths=args.paths, n_trades=args.trades, block_size=args.block,
+        ohlcv=ohlcv, atr_pct=args.atr_pct,
+        max_position_size=config.get('max_position_size', 0.1),
+        max_kelly=config.get('max_kelly', 0.25),
+        ruin_threshold=args.ruin, max_drawdown=max_drawdown,
+        workers=args.workers, seed=args.seed,
+    )
+    print_report(summary, max_drawdown)
+
+
+if __name__ == "__main__":
+    main()
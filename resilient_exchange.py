@@ -0,0 +1,347 @@
+# resilient_exchange.py
+"""
+Cliente resiliente para el exchange (envoltura de un exchange ccxt).
+
+- Sesión HTTP con pool de conexiones keep-alive.
+- Timeout por endpoint, aplicado por petición (no se toca el estado
+  compartido del exchange desde los hilos de hedging).
+- Lecturas idempotentes con reintentos (backoff exponencial con jitter) y
+  solicitudes "hedged": si una lectura tarda, se lanza una segunda en
+  paralelo y se usa la primera respuesta.
+- Órdenes con client order id: un reintento tras un timeout nunca duplica
+  la orden (primero se busca la orden, y el exchange rechaza ids repetidos).
+  Si el exchange no permite buscar órdenes cerradas (Bitso), la orden se
+  localiza por sus ejecuciones (fetch_my_trades).
+- Circuit breaker: tras varios fallos seguidos deja de llamar al exchange
+  durante un tiempo y sirve las últimas lecturas en caché.
+"""
+import logging
+import random
+import threading
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import ccxt
+from requests.adapters import HTTPAdapter
+
+READ_METHODS = (
+    'fetch_ohlcv',
+    'fetch_ticker',
+    'fetch_balance',
+    'fetch_order',
+    'fetch_open_orders',
+    'fetch_closed_orders',
+    'fetch_my_trades',
+    'load_markets',
+)
+
+DEFAULT_TIMEOUTS = {  # milisegundos
+    'fetch_ohlcv': 5000,
+    'fetch_ticker': 3000,
+    'fetch_balance': 5000,
+    'fetch_order': 5000,
+    'fetch_open_orders': 5000,
+    'fetch_closed_orders': 5000,
+    'fetch_my_trades': 5000,
+    'load_markets': 15000,
+    'create_order': 10000,
+    'cancel_order': 10000,
+}
+
+# Nombre del parámetro de client order id en cada exchange
+CLIENT_ID_PARAMS = {'bitso': 'client_id'}
+
+# Ejecuciones recientes que se revisan al buscar una orden (máximo de Bitso)
+MY_TRADES_LIMIT = 100
+
+
+class TimeoutAdapter(HTTPAdapter):
+    """
+    Adaptador HTTP con timeout por hilo: cada llamada fija el suyo en
+    `local.timeout` y así no se modifica `exchange.timeout`, que comparten
+    todos los hilos.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.local = threading.local()
+
+    def send(self, request, timeout=None, **kwargs):
+        override = getattr(self.local, 'timeout', None)
+        return super().send(request, timeout=override if override is not None else timeout, **kwargs)
+
+
+class CircuitOpenError(ccxt.ExchangeNotAvailable):
+    """El circuit breaker está abierto y no hay datos en caché"""
+
+
+class CircuitBreaker:
+    """
+    closed -> open tras `failure_threshold` fallos seguidos.
+    open -> half_open pasado `reset_timeout`: se permite una llamada de prueba;
+    si sale bien se cierra, si falla vuelve a abrirse.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self.opened_at = None
+        self.logger = logging.getLogger("CircuitBreaker")
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        if self.clock() - self.opened_at >= self.reset_timeout:
+            return 'half_open'
+        return 'open'
+
+    def allow(self):
+        return self.state != 'open'
+
+    def record_success(self):
+        if self.opened_at is not None:
+            self.logger.info("Circuito cerrado, exchange recuperado")
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == 'half_open' or self.failures >= self.failure_threshold:
+            if self.state != 'open':
+                self.logger.warning(f"Circuito abierto tras {self.failures} fallos")
+            self.opened_at = self.clock()
+
+
+class ResilientExchange:
+    """Envuelve un exchange ccxt con reintentos, hedging, idempotencia y circuit breaker"""
+
+    def __init__(self, exchange, config=None, sleep=time.sleep, clock=time.monotonic):
+        config = config or {}
+        self.exchange = exchange
+        self.sleep = sleep
+        self.clock = clock
+        self.max_retries = config.get('max_retries', 3)
+        self.max_order_retries = config.get('max_order_retries', 2)
+        self.backoff_base = config.get('backoff_base', 0.5)
+        self.backoff_cap = config.get('backoff_cap', 8.0)
+        self.hedge_after = config.get('hedge_after', 2.0)
+        self.max_cache_age = config.get('max_cache_age', 600)
+        self.timeouts = dict(DEFAULT_TIMEOUTS, **config.get('timeouts', {}))
+        self.client_id_param = CLIENT_ID_PARAMS.get(getattr(exchange, 'id', None), 'clientOrderId')
+        self.breaker = CircuitBreaker(
+            config.get('failure_threshold', 5), config.get('reset_timeout', 30.0), clock
+        )
+        self.cache = {}
+        self.acked_orders = set()  # ids de órdenes confirmadas, para no confundirlas al buscar
+        self.adapter = None
+        self.pool = ThreadPoolExecutor(max_workers=config.get('hedge_workers', 4), thread_name_prefix="hedge")
+        self.logger = logging.getLogger("ResilientExchange")
+        self._configure_session(config.get('pool_size', 10))
+
+    def _configure_session(self, pool_size):
+        """Reutiliza conexiones keep-alive; los reintentos los hacemos nosotros"""
+        session = getattr(self.exchange, 'session', None)
+        if session is None:
+            return
+        self.adapter = TimeoutAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        session.mount('https://', self.adapter)
+        session.mount('http://', self.adapter)
+        session.headers['Connection'] = 'keep-alive'
+
+    def __getattr__(self, name):
+        if name in READ_METHODS:
+            return lambda *args, **kwargs: self._read(name, args, kwargs)
+        return getattr(self.exchange, name)
+
+    def _backoff(self, attempt):
+        """Backoff exponencial con jitter completo"""
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+
+    def _call(self, method, args, kwargs):
+        if self.adapter is None or method not in self.timeouts:
+            return getattr(self.exchange, method)(*args, **kwargs)
+        self.adapter.local.timeout = self.timeouts[method] / 1000
+        try:
+            return getattr(self.exchange, method)(*args, **kwargs)
+        finally:
+            self.adapter.local.timeout = None
+
+    def _hedged(self, method, args, kwargs):
+        """Si la primera lectura no responde en `hedge_after` s, lanza una segunda"""
+        if not self.hedge_after:
+            return self._call(method, args, kwargs)
+        pending = {self.pool.submit(self._call, method, args, kwargs)}
+        done, pending = wait(pending, timeout=self.hedge_after)
+        if not done:
+            self.logger.info(f"{method} lento, enviando solicitud de respaldo")
+            pending.add(self.pool.submit(self._call, method, args, kwargs))
+        error = None
+        while done or pending:
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+                error = future.exception()
+            if not pending:
+                break
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        raise error
+
+    def _cached(self, key, method, error):
+        """Último dato bueno si no es demasiado viejo; si no, propaga el error"""
+        if key in self.cache:
+            stored_at, result = self.cache[key]
+            age = self.clock() - stored_at
+            if age <= self.max_cache_age:
+                self.logger.warning(f"{method}: usando caché de hace {age:.0f}s ({error})")
+                return result
+        raise error
+
+    def _read(self, method, args, kwargs):
+        key = (method, repr(args), repr(sorted(kwargs.items())))
+        if not self.breaker.allow():
+            return self._cached(key, method, CircuitOpenError(f"Circuito abierto, {method} no disponible"))
+
+        error = None
+        for attempt in range(self.max_retries + 1):
+            try:
+                result = self._hedged(method, args, kwargs)
+            except ccxt.NetworkError as e:
+                error = e
+                self.breaker.record_failure()
+                self.logger.warning(f"{method} falló (intento {attempt + 1}): {e}")
+                if not self.breaker.allow() or attempt == self.max_retries:
+                    break
+                self.sleep(self._backoff(attempt))
+                continue
+            self.breaker.record_success()
+            self.cache[key] = (self.clock(), result)
+            return result
+        return self._cached(key, method, error)
+
+    def _supports(self, capability, method):
+        has = getattr(self.exchange, 'has', None)
+        if has is None:
+            return hasattr(self.exchange, method)
+        return bool(has.get(capability))
+
+    def _matches_client_id(self, order, client_id):
+        info = order.get('info') or {}
+        return client_id in (order.get('clientOrderId'), info.get(self.client_id_param))
+
+    def _find_order(self, symbol, client_id, side, amount, since):
+        """
+        Busca una orden enviada cuya confirmación se perdió.
+        Primero por client order id en órdenes abiertas/cerradas; si el
+        exchange no lista órdenes cerradas (Bitso), por sus ejecuciones:
+        mismo lado, posteriores al envío, cantidad igual a la pedida y de una
+        orden que no teníamos confirmada.
+        """
+        lookups = [('fetchOpenOrders', 'fetch_open_orders'), ('fetchClosedOrders', 'fetch_closed_orders')]
+        for capability, method in lookups:
+            if not self._supports(capability, method):
+                continue
+            try:
+                orders = self._call(method, (symbol,), {})
+            except ccxt.BaseError as e:
+                self.logger.warning(f"No se pudo verificar la orden {client_id} con {method}: {e}")
+                continue
+            for order in orders:
+                if self._matches_client_id(order, client_id):
+                    return order
+
+        if not self._supports('fetchMyTrades', 'fetch_my_trades'):
+            return None
+        try:
+            # Sin `since`: Bitso lo rechaza si no va con un `marker`; se filtra aquí
+            trades = self._call('fetch_my_trades', (symbol, None, MY_TRADES_LIMIT), {})
+        except ccxt.BaseError as e:
+            self.logger.warning(f"No se pudo verificar la orden {client_id} con fetch_my_trades: {e}")
+            return None
+
+        filled = {}
+        for trade in trades:
+            order_id = trade.get('order')
+            if not order_id or order_id in self.acked_orders or trade.get('side') != side:
+                continue
+            if (trade.get('timestamp') or 0) < since:
+                continue
+            filled[order_id] = filled.get(order_id, 0.0) + (trade.get('amount') or 0.0)
+        tolerance = max(abs(amount) * 1e-6, 1e-12)
+        for order_id, filled_amount in filled.items():
+            if abs(filled_amount - amount) > tolerance:
+                continue
+            try:
+                order = self._call('fetch_order', (order_id, symbol), {})
+            except ccxt.BaseError:
+                # Sin detalle de la orden, las ejecuciones bastan para confirmarla
+                return {'id': order_id, 'clientOrderId': client_id, 'symbol': symbol, 'side': side,
+                        'amount': amount, 'filled': filled_amount, 'status': 'closed'}
+            if order.get('clientOrderId') and not self._matches_client_id(order, client_id):
+                continue
+            return order
+        return None
+
+    def _acked(self, order):
+        if order and order.get('id'):
+            self.acked_orders.add(order['id'])
+        return order
+
+    def create_order(self, symbol, type, side, amount, price=None, params=None):
+        if not self.breaker.allow():
+            raise CircuitOpenError(f"Circuito abierto, orden {side} {symbol} no enviada")
+
+        params = dict(params or {})
+        client_id = params.setdefault(self.client_id_param, uuid.uuid4().hex)
+        # Margen por desfase de reloj al buscar ejecuciones de esta orden
+        since = self.exchange.milliseconds() - 60000
+        for attempt in range(self.max_order_retries + 1):
+            try:
+                order = self._call('create_order', (symbol, type, side, amount, price, params), {})
+                self.breaker.record_success()
+                return self._acked(order)
+            except ccxt.NetworkError as e:
+                self.breaker.record_failure()
+                self.logger.warning(f"Orden {client_id} sin confirmar (intento {attempt + 1}): {e}")
+                # La orden pudo llegar al exchange aunque no recibimos respuesta
+                order = self._find_order(symbol, client_id, side, amount, since)
+                if order:
+                    return self._acked(order)
+                if attempt == self.max_order_retries:
+                    raise
+                self.sleep(self._backoff(attempt))
+            except ccxt.ExchangeError:
+                # En un reintento, un rechazo suele ser por client id duplicado:
+                # la orden original sí entró
+                if attempt == 0:
+                    raise
+                order = self._find_order(symbol, client_id, side, amount, since)
+                if order:
+                    return self._acked(order)
+                raise
+
+    def create_market_buy_order(self, symbol, amount, params=None):
+        return self.create_order(symbol, 'market', 'buy', amount, params=params)
+
+    def create_market_sell_order(self, symbol, amount, params=None):
+        return self.create_order(symbol, 'market', 'sell', amount, params=params)
+
+    def cancel_order(self, id, symbol=None, params=None):
+        for attempt in range(self.max_order_retries + 1):
+            try:
+                return self._call('cancel_order', (id, symbol, params or {}), {})
+            except ccxt.OrderNotFound:
+                # Un reintento que ya no encuentra la orden: la cancelación anterior funcionó
+                if attempt == 0:
+                    raise
+                return {'id': id, 'symbol': symbol, 'status': 'canceled'}
+            except ccxt.NetworkError:
+                if attempt == self.max_order_retries:
+                    raise
+                self.sleep(self._backoff(attempt))
+
+    def close(self):
+        self.pool.shutdown(wait=False)
@@ -0,0 +1,157 @@
+# scheduler.py
+import heapq
+import logging
+import time
+from typing import Callable, Dict, List, Optional
+
+from event_bus import bus
+
+TIMEFRAME_UNITS = {'m': 60, 'h': 3600, 'd': 86400, 'w': 604800}
+
+
+def timeframe_to_seconds(timeframe: str) -> int:
+    """Convierte un timeframe estilo ccxt ('5m', '1h', '1d') a segundos"""
+    unit = timeframe[-1]
+    if unit not in TIMEFRAME_UNITS or not timeframe[:-1].isdigit():
+        raise ValueError(f"Timeframe no soportado: {timeframe}")
+    return int(timeframe[:-1]) * TIMEFRAME_UNITS[unit]
+
+
+def drop_open_candle(ohlcv: List[list], timeframe: str, now: Optional[float] = None) -> List[list]:
+    """
+    Quita la última vela si todavía no ha cerrado.
+    Los exchanges devuelven la vela en curso al final; las señales deben
+    evaluarse solo sobre velas cerradas.
+    """
+    if not ohlcv:
+        return ohlcv
+    now = time.time() if now is None else now
+    period_ms = timeframe_to_seconds(timeframe) * 1000
+    if ohlcv[-1][0] + period_ms > now * 1000:
+        return ohlcv[:-1]
+    return ohlcv
+
+
+class CandleScheduler:
+    """
+    Planificador alineado al cierre de vela.
+
+    Cada trabajo se dispara justo después del límite de su timeframe
+    (más un retraso de asentamiento para que el exchange publique la vela
+    cerrada). Los plazos se calculan sobre el reloj y no sobre el fin del
+    trabajo anterior, así que los ciclos no se van desplazando. Si un ciclo
+    se retrasa más de un periodo, los ticks perdidos se saltan en lugar de
+    acumularse.
+
+    Sin `run_now`, la primera ejecución espera al siguiente límite de vela
+    (hasta un timeframe completo, p. ej. una hora con '1h').
+    """
+
+    def __init__(self, timeframe: str = '5m', settle_delay: float = 2.0,
+                 clock: Callable[[], float] = time.time,
+                 sleep: Callable[[float], None] = time.sleep):
+        self.timeframe = timeframe
+        self.settle_delay = settle_delay
+        self.clock = clock
+        self.sleep = sleep
+        self.is_running = False
+        self.jobs: Dict[str, dict] = {}
+        self._queue = []  # heap de (deadline, orden, nombre)
+        self._counter = 0
+        self.logger = logging.getLogger("Scheduler")
+
+    def next_deadline(self, timeframe: str, now: Optional[float] = None) -> float:
+        """Primer límite de vela (más asentamiento) estrictamente posterior a `now`"""
+        now = self.clock() if now is None else now
+        period = timeframe_to_seconds(timeframe)
+        boundary = (now - self.settle_delay) // period * period
+        return boundary + period + self.settle_delay
+
+    def add_job(self, name: str, func: Callable[[], None], timeframe: Optional[str] = None,
+                run_now: bool = False):
+        """Registra un trabajo (p. ej. un símbolo) con su propio plazo; `run_now` lo ejecuta ya al arrancar"""
+        timeframe = timeframe or self.timeframe
+        self.jobs[name] = {
+            'func': func,
+            'timeframe': timeframe,
+            'period': timeframe_to_seconds(timeframe),
+            'runs': 0,
+            'skipped': 0,
+            'errors': 0,
+            'last_lag': 0.0,
+            'max_lag': 0.0,
+            'startup': run_now,
+        }
+        if run_now:
+            self._push(name, self.clock())
+        else:
+            self._push(name, self.next_deadline(timeframe))
+
+    def _push(self, name: str, deadline: float):
+        self._counter += 1
+        heapq.heappush(self._queue, (deadline, self._counter, name))
+
+    def run_pending(self) -> int:
+        """Ejecuta los trabajos cuyo plazo ya venció. Devuelve cuántos corrieron."""
+        executed = 0
+        while self._queue and self._queue[0][0] <= self.clock():
+            deadline, _, name = heapq.heappop(self._queue)
+            job = self.jobs.get(name)
+            if job is None:
+                continue
+
+            # Lag de planificación: cuánto tarde arrancó respecto al plazo
+            lag = self.clock() - deadline
+            job['last_lag'] = lag
+            job['max_lag'] = max(job['max_lag'], lag)
+            job['runs'] += 1
+            self.logger.debug(f"{name}: lag de planificación {lag:.3f}s")
+            started = time.perf_counter()
+            try:
+                job['func']()
+            except Exception as e:
+                job['errors'] += 1
+                self.logger.error(f"Error en trabajo {name}: {e}")
+            bus.publish('cycle', job=name, lag=lag, duration=time.perf_counter() - started)
+            executed += 1
+
+            # Siguiente plazo; los ticks ya pasados se saltan
+            next_deadline = deadline + job['period']
+            now = self.clock()
+            if job['startup']:
+                # La ejecución de arranque no está alineada: volver al límite de vela
+                job['startup'] = False
+                next_deadline = self.next_deadline(job['timeframe'], now)
+            elif next_deadline <= now:
+                missed = int((now - next_deadline) // job['period']) + 1
+                job['skipped'] += missed
+                next_deadline += missed * job['period']
+                self.logger.warning(f"{name}: {missed} tick(s) saltados por retraso")
+            self._push(name, next_deadline)
+        return executed
+
+    def seconds_until_next(self) -> Optional[float]:
+        if not self._queue:
+            return None
+        return max(0.0, self._queue[0][0] - self.clock())
+
+    def stats(self) -> Dict[str, dict]:
+        """Métricas por trabajo: ejecuciones, ticks saltados, errores y lag"""
+        return {
+            name: {k: v for k, v in job.items() if k != 'func'}
+            for name, job in self.jobs.items()
+        }
+
+    def run_forever(self):
+        """Bucle principal: duerme hasta el siguiente plazo y ejecuta"""
+        self.is_running = True
+        while self.is_running:
+            wait = self.seconds_until_next()
+            if wait is None:
+                break
+            if wait > 0:
+                self.sleep(wait)
+            self.run_pending()
+
+    def stop(self):
+        self.is_running = False
@@ -0,0 +1,121 @@
+# test_dashboard.py
+# Prueba las series del dashboard y los deltas de extendData con un bus privado.
+# Se ejecuta con: python test_dashboard.py  (o con pytest)
+import logging
+import time
+
+from dash import no_update
+
+from dashboard import DashboardState, RingSeries, create_app
+from event_bus import EventBus
+
+logging.disable(logging.CRITICAL)
+
+SYMBOLS = ['BTC/MXN', 'ETH/MXN']
+
+
+def make_state(resolution=1.0):
+    bus = EventBus()
+    return DashboardState(SYMBOLS, event_bus=bus, resolution=resolution), bus
+
+
+def test_bucket_closes_only_when_complete():
+    series = RingSeries(resolution=1.0, agg='last')
+    series.add(10.2, 1.0)
+    series.add(10.7, 2.0)
+    assert series.since(0, now=10.9) == []
+    # since() cierra el bucket abierto cuando ya pasó su intervalo
+    assert series.since(0, now=11.0) == [(1, 10.0, 2.0)]
+    assert series.since(1, now=12.0) == []
+
+
+def test_late_event_goes_to_next_bucket():
+    series = RingSeries(resolution=1.0, agg='max')
+    series.add(10.5, 5.0)
+    assert series.since(0, now=11.0) == [(1, 10.0, 5.0)]
+    # Evento tardío del bucket 10 ya publicado: cae en el bucket 11
+    series.add(10.8, 7.0)
+    series.add(11.3, 3.0)
+    assert series.since(1, now=12.0) == [(2, 11.0, 7.0)]
+
+
+def test_capacity_and_aggregators():
+    series = RingSeries(capacity=3, resolution=1.0, agg='mean')
+    for t in range(6):
+        series.add(t, 1.0)
+        series.add(t + 0.5, 3.0)
+    points = series.since(0, now=10.0)
+    assert [p[0] for p in points] == [4, 5, 6]
+    assert all(p[2] == 2.0 for p in points)
+
+
+def test_deltas_from_bus_events_and_cursors():
+    state, bus = make_state()
+    bus.publish('signal', symbol='BTC/MXN', price=100.0, rsi=30.0)
+    bus.publish('signal', symbol='ETH/MXN', price=50.0, rsi=None)
+    bus.publish('cycle', job='BTC/MXN', lag=0.1, duration=0.2)
+    bus.publish('cycle', job='ETH/MXN', lag=0.3, duration=0.1)
+    state.consume()
+
+    later = time.time() + 10
+    prices = [state.prices[s] for s in SYMBOLS]
+    payload, cursors = state.deltas(prices, [0, 0], now=later)
+    data, indices, max_points = payload
+    assert data['y'] == [[100.0], [50.0]]
+    assert len(data['x'][0]) == 1 and len(data['x'][1]) == 1
+    assert indices == [0, 1] and max_points == state.capacity
+    assert cursors == [1, 1]
+
+    # Sin puntos nuevos no hay payload y los cursores no cambian
+    assert state.deltas(prices, cursors, now=later) == (None, [1, 1])
+    # El RSI nulo no se grafica
+    payload, cursors = state.deltas([state.rsi[s] for s in SYMBOLS], [0, 0], now=later)
+    assert payload[0]['y'] == [[30.0], []] and cursors == [1, 0]
+    # La latencia se agrega con el máximo del bucket
+    payload, _ = state.deltas([state.lag, state.duration], [0, 0], now=later)
+    assert payload[0]['y'] == [[0.3], [0.2]]
+
+
+def test_positions_and_pnl():
+    state, bus = make_state()
+    bus.publish('position', symbol='BTC/MXN', side='buy', amount=0.01, price=100.0)
+    state.consume()
+    assert list(state.positions) == ['BTC/MXN']
+    bus.publish('position', symbol='BTC/MXN', side='sell', amount=0.01, price=110.0, pnl=0.1)
+    state.consume()
+    assert state.positions == {} and state.total_pnl == 0.1
+
+
+def test_callback_sends_only_new_points():
+    state, bus = make_state(resolution=0.05)
+    # La función original del callback, sin el contexto de Dash
+    callback = next(iter(create_app(state).callback_map.values()))
+    push_deltas = callback['callback'].__wrapped__
+    cursors = {'price': [0, 0], 'rsi': [0, 0], 'pnl': [0], 'latency': [0, 0]}
+
+    bus.publish('signal', symbol='BTC/MXN', price=100.0, rsi=40.0)
+    state.consume()
+    time.sleep(0.1)
+    price, rsi, pnl, latency, cursors, positions, signals = push_deltas(1, cursors)
+    assert price[0]['y'] == [[100.0], []] and rsi[0]['y'] == [[40.0], []]
+    assert pnl is no_update and latency is no_update
+    assert cursors['price'] == [1, 0] and positions == "Sin posiciones" and len(signals) == 1
+
+    # Segunda actualización sin eventos: nada que enviar
+    outputs = push_deltas(2, cursors)
+    assert all(output is no_update for output in outputs[:4])
+    assert outputs[4]['price'] == [1, 0]
+
+
+if __name__ == "__main__":
+    print("🧪 Probando el dashboard...")
+    failed = 0
+    for name, test in list(globals().items()):
+        if name.startswith('test_') and callable(test):
+            try:
+                test()
+                print(f"✅ {name}")
+            except Exception as e:
+                failed += 1
+                print(f"❌ {name}: {e!r}")
+    print("Todo bien!" if not failed else f"{failed} prueba(s) fallaron")
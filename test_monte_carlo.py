@@ -0,0 +1,91 @@
+# test_monte_carlo.py
+# Prueba que el Kelly vectorizado coincide con RiskManager y que la simulación es reproducible.
+# Se ejecuta con: python test_monte_carlo.py  (o con pytest)
+import os
+
+import numpy as np
+
+from monte_carlo import KELLY_WINDOW, rolling_kelly, run_simulation
+from risk_manager import RiskManager
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def make_risk():
+    return RiskManager(os.path.join(ROOT, 'config_advanced.json'))
+
+
+def reference_kelly(risk, history, path):
+    """Kelly de RiskManager trade a trade, con la misma ventana que mantiene update_history"""
+    expected = []
+    window = list(history)[-KELLY_WINDOW:]
+    for r in path:
+        risk.trade_results = window
+        # Pérdidas de 0.0 dan avg_loss = 0 y RiskManager divide entre cero (ratio infinito)
+        with np.errstate(divide='ignore'):
+            expected.append(risk.calculate_dynamic_kelly())
+        window = (window + [float(r)])[-KELLY_WINDOW:]
+    return expected
+
+
+def assert_matches_risk_manager(history, sim_returns):
+    risk = make_risk()
+    kelly = rolling_kelly(history, sim_returns, risk.max_position_size_pct, risk.max_kelly)
+    assert kelly.shape == sim_returns.shape
+    for path, row in zip(sim_returns, kelly):
+        np.testing.assert_allclose(row, reference_kelly(risk, history, path), rtol=1e-12, atol=1e-15)
+
+
+def test_rolling_kelly_matches_risk_manager_on_sliding_windows():
+    rng = np.random.default_rng(1)
+    history = rng.normal(0.002, 0.02, 80)
+    sim_returns = rng.normal(0.001, 0.02, (3, 120))
+    # La ventana se desliza más allá de los 50 trades y sale el historial real
+    assert_matches_risk_manager(history, sim_returns)
+
+
+def test_rolling_kelly_with_fewer_than_five_trades():
+    rng = np.random.default_rng(2)
+    sim_returns = rng.normal(0.0, 0.02, (2, 12))
+    # Sin historial y con historial corto: los primeros trades usan el tamaño conservador
+    assert_matches_risk_manager([], sim_returns)
+    assert_matches_risk_manager([0.01, -0.02, 0.03], sim_returns)
+
+
+def test_rolling_kelly_edge_cases():
+    # Solo ganancias, solo pérdidas y retornos en cero (cuentan como pérdida)
+    sim_returns = np.array([
+        [0.01] * 10,
+        [-0.01] * 10,
+        [0.0, 0.01, 0.0, -0.01, 0.0, 0.02, 0.0, 0.0, -0.02, 0.01],
+    ])
+    assert_matches_risk_manager([], sim_returns)
+    assert_matches_risk_manager([0.02] * 60, sim_returns)
+
+
+def test_fixed_seed_is_reproducible_across_workers():
+    rng = np.random.default_rng(3)
+    trade_returns = rng.normal(0.003, 0.02, 40).tolist()
+    kwargs = dict(n_paths=5000, n_trades=60, block_size=3, chunk_size=1000, seed=123)
+    serial = run_simulation(trade_returns, workers=1, **kwargs)
+    parallel = run_simulation(trade_returns, workers=2, **kwargs)
+    for summary in (serial, parallel):
+        summary.pop('elapsed_seconds')
+    assert serial == parallel
+    other = run_simulation(trade_returns, workers=1, **dict(kwargs, seed=124))
+    other.pop('elapsed_seconds')
+    assert other != serial
+
+
+if __name__ == "__main__":
+    print("🧪 Probando el simulador Monte Carlo...")
+    failed = 0
+    for name, test in list(globals().items()):
+        if name.startswith('test_') and callable(test):
+            try:
+                test()
+                print(f"✅ {name}")
+            except Exception as e:
+                failed += 1
+                print(f"❌ {name}: {e!r}")
+    print("Todo bien!" if not failed else f"{failed} prueba(s) fallaron")
@@ -0,0 +1,207 @@
+# test_resilient_exchange.py
+# Prueba el cliente resiliente contra un exchange local con fallos inyectados.
+# Se ejecuta con: python test_resilient_exchange.py  (o con pytest)
+import contextlib
+import io
+import logging
+import threading
+import time
+
+import ccxt
+
+from fake_exchange import FaultyExchange
+from resilient_exchange import CircuitOpenError, ResilientExchange
+
+logging.disable(logging.CRITICAL)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+# Bitso no lista órdenes cerradas; sí las ejecuciones propias
+BITSO = {'id': 'bitso', 'has': {'fetchOpenOrders': True, 'fetchClosedOrders': None, 'fetchMyTrades': True}}
+
+
+def make_client(script=None, exchange_kwargs=None, **config):
+    clock = FakeClock()
+    exchange = FaultyExchange(script=script, **(exchange_kwargs or {}))
+    config.setdefault('hedge_after', None)
+    client = ResilientExchange(exchange, config, sleep=clock.sleep, clock=clock)
+    return client, exchange, clock
+
+
+def test_read_retries_network_errors():
+    client, exchange, _ = make_client({'fetch_ohlcv': ['timeout', 'down']})
+    candles = client.fetch_ohlcv('BTC/MXN', timeframe='5m', limit=100)
+    assert len(candles) == 100
+    assert exchange.calls['fetch_ohlcv'] == 3
+
+
+def test_exchange_errors_are_not_retried():
+    client, exchange, _ = make_client()
+    exchange.fetch_balance = lambda: (_ for _ in ()).throw(ccxt.AuthenticationError("bad key"))
+    try:
+        client.fetch_balance()
+        assert False, "debió propagar AuthenticationError"
+    except ccxt.AuthenticationError:
+        pass
+
+
+def test_circuit_breaker_serves_cache_and_recovers():
+    client, exchange, clock = make_client(failure_threshold=2, reset_timeout=30, max_retries=1)
+    fresh = client.fetch_ohlcv('BTC/MXN', limit=100)
+
+    exchange.failure_rate = 1.0
+    assert client.fetch_ohlcv('BTC/MXN', limit=100) == fresh  # reintentos agotados -> caché
+    assert client.breaker.state == 'open'
+
+    calls = exchange.calls['fetch_ohlcv']
+    assert client.fetch_ohlcv('BTC/MXN', limit=100) == fresh  # circuito abierto: sin llamar al exchange
+    assert exchange.calls['fetch_ohlcv'] == calls
+    try:
+        client.fetch_ticker('BTC/MXN')
+        assert False, "sin caché debió fallar"
+    except CircuitOpenError:
+        pass
+    try:
+        client.create_market_buy_order('BTC/MXN', 0.01)
+        assert False, "no se deben enviar órdenes con el circuito abierto"
+    except CircuitOpenError:
+        pass
+
+    exchange.failure_rate = 0.0
+    clock.now += 31
+    assert client.breaker.state == 'half_open'
+    client.fetch_ohlcv('BTC/MXN', limit=100)
+    assert client.breaker.state == 'closed'
+
+
+def test_order_timeout_after_fill_is_not_duplicated():
+    client, exchange, _ = make_client({'create_order': ['timeout_after_fill']})
+    order = client.create_market_buy_order('BTC/MXN', 0.01)
+    assert len(exchange.orders) == 1
+    assert order['id'] == exchange.orders[0]['id']
+
+
+def test_order_retry_reuses_client_order_id():
+    client, exchange, _ = make_client({
+        'create_order': ['timeout', 'timeout_after_fill'],
+        'fetch_closed_orders': ['down', 'down'],
+    })
+    order = client.create_market_sell_order('BTC/MXN', 0.01)
+    # La verificación falló y se reintentó con el mismo id: el exchange rechazó el duplicado
+    assert len(exchange.orders) == 1
+    assert order['clientOrderId'] == exchange.orders[0]['clientOrderId']
+
+
+def test_bitso_order_found_by_trades_after_timeout():
+    client, exchange, _ = make_client({'create_order': ['timeout_after_fill']}, BITSO)
+    order = client.create_market_buy_order('BTC/MXN', 0.01)
+    assert len(exchange.orders) == 1
+    assert order['id'] == exchange.orders[0]['id']
+    assert exchange.calls.get('fetch_closed_orders', 0) == 0
+    # Bitso recibe el client id con su propio nombre de parámetro
+    assert exchange.orders[0]['clientOrderId'] == order['clientOrderId']
+
+
+def test_bitso_duplicate_rejection_recovers_order():
+    client, exchange, _ = make_client({
+        'create_order': [None, 'timeout_after_fill', 'timeout_after_fill'],
+        'fetch_my_trades': ['down'],
+    }, BITSO)
+    client.create_market_buy_order('BTC/MXN', 0.02)  # una orden anterior ya confirmada
+    order = client.create_market_buy_order('BTC/MXN', 0.02)
+    # El reintento se rechaza como duplicado y la orden aparece por sus ejecuciones,
+    # sin confundirla con la anterior de la misma cantidad
+    assert len(exchange.orders) == 2
+    assert order['id'] == exchange.orders[1]['id']
+
+
+def test_bitso_lookup_ignores_trades_before_the_order():
+    client, exchange, _ = make_client({'create_order': [None, 'timeout_after_fill']}, BITSO)
+    # Orden manual anterior, de la misma cantidad y que el cliente no confirmó
+    exchange.create_order('BTC/MXN', 'market', 'buy', 0.01)
+    exchange.trades[0]['timestamp'] -= 3600 * 1000
+    order = client.create_market_buy_order('BTC/MXN', 0.01)
+    assert len(exchange.orders) == 2
+    assert order['id'] == exchange.orders[1]['id']
+
+
+def test_bitso_fake_rejects_since_like_ccxt():
+    exchange = FaultyExchange(**BITSO)
+    try:
+        exchange.fetch_my_trades('BTC/MXN', since=exchange.milliseconds())
+        assert False, "Bitso no acepta since sin marker"
+    except ccxt.ExchangeError:
+        pass
+    assert exchange.fetch_my_trades('BTC/MXN', since=0, params={'marker': 1}) == []
+
+
+def test_timeout_is_set_per_request_thread():
+    seen = {}
+    client, exchange, _ = make_client(timeouts={'fetch_ticker': 1500, 'load_markets': 20000})
+    client.adapter = type('Adapter', (), {'local': threading.local()})()
+    original_timeout = 10000
+    exchange.timeout = original_timeout
+
+    def fetch_ticker(symbol):
+        seen['fetch_ticker'] = (client.adapter.local.timeout, exchange.timeout)
+        return {'symbol': symbol, 'last': 1.0}
+
+    def load_markets():
+        seen['load_markets'] = (client.adapter.local.timeout, exchange.timeout)
+        return {}
+
+    exchange.fetch_ticker, exchange.load_markets = fetch_ticker, load_markets
+    worker = threading.Thread(target=client.load_markets)
+    worker.start()
+    worker.join()
+    client.fetch_ticker('BTC/MXN')
+    assert seen == {'fetch_ticker': (1.5, original_timeout), 'load_markets': (20.0, original_timeout)}
+    assert getattr(client.adapter.local, 'timeout', None) is None
+
+
+def test_hedged_read_uses_fastest_response():
+    exchange = FaultyExchange(script={'fetch_ticker': ['slow']}, slow_latency=1.0)
+    client = ResilientExchange(exchange, {'hedge_after': 0.05})
+    start = time.perf_counter()
+    ticker = client.fetch_ticker('BTC/MXN')
+    assert ticker['symbol'] == 'BTC/MXN'
+    assert time.perf_counter() - start < 0.5
+    assert exchange.calls['fetch_ticker'] == 2
+    client.close()
+
+
+def test_bot_cycle_survives_flaky_exchange():
+    from advanced_bot import BitsoTradingBot
+    exchange = FaultyExchange(failure_rate=0.3, seed=7)
+    client = ResilientExchange(exchange, {'hedge_after': None, 'failure_threshold': 100}, sleep=lambda s: None)
+    bot = BitsoTradingBot('config_advanced.json', exchange=client, notify=False)
+    bot.symbols = ['BTC/MXN', 'ETH/MXN']
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(50):
+            bot.run_cycle()
+    client_ids = [o['clientOrderId'] for o in exchange.orders]
+    assert len(client_ids) == len(set(client_ids))
+
+
+if __name__ == "__main__":
+    print("🧪 Probando el cliente resiliente con fallos inyectados...")
+    failed = 0
+    for name, test in list(globals().items()):
+        if name.startswith('test_') and callable(test):
+            try:
+                test()
+                print(f"✅ {name}")
+            except Exception as e:
+                failed += 1
+                print(f"❌ {name}: {e!r}")
+    print("Todo bien!" if not failed else f"{failed} prueba(s) fallaron")
@@ -0,0 +1,143 @@
+# test_scheduler.py
+# Prueba el planificador alineado a velas con un reloj simulado.
+# Se ejecuta con: python test_scheduler.py  (o con pytest)
+import logging
+
+from scheduler import CandleScheduler, drop_open_candle, timeframe_to_seconds
+
+logging.disable(logging.CRITICAL)
+
+
+class FakeClock:
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def make_scheduler(now, timeframe='5m', settle_delay=2.0):
+    clock = FakeClock(now)
+    return CandleScheduler(timeframe, settle_delay=settle_delay, clock=clock, sleep=clock.sleep), clock
+
+
+def test_timeframe_to_seconds():
+    assert timeframe_to_seconds('5m') == 300
+    assert timeframe_to_seconds('1h') == 3600
+    assert timeframe_to_seconds('1d') == 86400
+
+
+def test_deadline_aligned_to_boundary_plus_settle():
+    scheduler, _ = make_scheduler(1000.0)
+    assert scheduler.next_deadline('5m', 1000.0) == 1202.0
+    assert scheduler.next_deadline('5m', 1201.9) == 1202.0
+    # Exactamente en el plazo: el siguiente es el del próximo límite
+    assert scheduler.next_deadline('5m', 1202.0) == 1502.0
+    assert scheduler.next_deadline('1h', 1000.0) == 3602.0
+
+
+def test_runs_on_each_boundary_without_drift():
+    scheduler, clock = make_scheduler(1000.0)
+    fired = []
+
+    def job():
+        fired.append(clock.now)
+        clock.now += 7  # el trabajo tarda, pero no desplaza al siguiente
+        if len(fired) == 3:
+            scheduler.stop()
+
+    scheduler.add_job('BTC/MXN', job)
+    scheduler.run_forever()
+    assert fired == [1202.0, 1502.0, 1802.0]
+
+
+def test_overrun_skips_missed_ticks():
+    scheduler, clock = make_scheduler(1000.0)
+    fired = []
+
+    def job():
+        fired.append(clock.now)
+        if len(fired) == 1:
+            clock.now += 700  # se come dos límites (1502 y 1802)
+        if len(fired) == 2:
+            scheduler.stop()
+
+    scheduler.add_job('BTC/MXN', job)
+    scheduler.run_forever()
+    assert fired == [1202.0, 2102.0]
+    assert scheduler.stats()['BTC/MXN']['skipped'] == 2
+    assert scheduler.stats()['BTC/MXN']['runs'] == 2
+
+
+def test_lag_is_reported():
+    scheduler, clock = make_scheduler(1000.0)
+    scheduler.add_job('BTC/MXN', lambda: None)
+    clock.now = 1202.75  # el proceso despertó tarde
+    assert scheduler.run_pending() == 1
+    stats = scheduler.stats()['BTC/MXN']
+    assert abs(stats['last_lag'] - 0.75) < 1e-9
+    assert abs(stats['max_lag'] - 0.75) < 1e-9
+    assert stats['skipped'] == 0
+
+
+def test_job_errors_are_counted_and_loop_continues():
+    scheduler, clock = make_scheduler(1000.0)
+
+    def failing():
+        raise RuntimeError("boom")
+
+    scheduler.add_job('BTC/MXN', failing)
+    clock.now = 1202.0
+    scheduler.run_pending()
+    assert scheduler.stats()['BTC/MXN']['errors'] == 1
+    assert scheduler.seconds_until_next() == 300.0
+
+
+def test_run_now_then_realigns():
+    scheduler, clock = make_scheduler(1000.0)
+    fired = []
+    scheduler.add_job('BTC/MXN', lambda: fired.append(clock.now), run_now=True)
+    scheduler.run_pending()
+    assert fired == [1000.0]
+    assert scheduler.seconds_until_next() == 202.0
+    assert scheduler.stats()['BTC/MXN']['skipped'] == 0
+
+
+def test_drop_open_candle_at_exact_boundary():
+    candles = [[0, 1, 1, 1, 1, 1], [300000, 1, 1, 1, 1, 1]]
+    # La segunda vela (300s-600s) sigue abierta hasta 600s
+    assert len(drop_open_candle(candles, '5m', now=599.999)) == 1
+    assert len(drop_open_candle(candles, '5m', now=600.0)) == 2
+    assert drop_open_candle([], '5m', now=600.0) == []
+
+
+def test_exit_job_skips_closed_stock_market():
+    from advanced_bot import BitsoTradingBot
+    from fake_exchange import FakeExchange
+    exchange = FakeExchange()
+    bot = BitsoTradingBot('config_advanced.json', exchange=exchange, notify=False)
+    position = {'amount': 1.0, 'buy_price': 100.0, 'stop_loss': 1e9, 'take_profit': 2e9}
+    bot.active_positions = {'NVDA/MXN': dict(position), 'BTC/MXN': dict(position)}
+    # Sábado 2026-10-17 12:00 UTC: NYSE cerrado, cripto abierto
+    exchange.milliseconds = lambda: 1792238400000
+    bot.check_exits('NVDA/MXN')
+    bot.check_exits('BTC/MXN')
+    assert [o['symbol'] for o in exchange.orders] == ['BTC/MXN']
+    assert list(bot.active_positions) == ['NVDA/MXN']
+
+
+if __name__ == "__main__":
+    print("🧪 Probando el planificador...")
+    failed = 0
+    for name, test in list(globals().items()):
+        if name.startswith('test_') and callable(test):
+            try:
+                test()
+                print(f"✅ {name}")
+            except Exception as e:
+                failed += 1
+                print(f"❌ {name}: {e!r}")
+    print("Todo bien!" if not failed else f"{failed} prueba(s) fallaron")
@@ -0,0 +1,215 @@
+# test_trade_journal.py
+# Prueba la grabación y reproducción del diario contra el FakeExchange.
+# Se ejecuta con: python test_trade_journal.py  (o con pytest)
+import contextlib
+import io
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+
+from event_bus import bus
+from fake_exchange import FakeExchange, generate_candles
+from trade_journal import (RecordingExchange, ReplayExchange, decode_ohlcv, encode_ohlcv,
+                           read_journal, replay_bitso)
+
+logging.disable(logging.CRITICAL)
+
+SYMBOLS = ['BTC/MXN', 'ETH/MXN']
+
+
+def temp_path(name):
+    return os.path.join(tempfile.mkdtemp(), name)
+
+
+def record_session(path, series, cycles, close=True):
+    """Graba `cycles` ciclos del bot con una ventana deslizante de velas"""
+    from advanced_bot import BitsoTradingBot
+    fake = FakeExchange()
+    recorder = RecordingExchange(fake, path)
+    bot = BitsoTradingBot('config_advanced.json', exchange=recorder, notify=False)
+    bot.symbols = SYMBOLS
+    with contextlib.redirect_stdout(io.StringIO()):
+        for i in cycles:
+            for symbol in SYMBOLS:
+                fake.candles[symbol] = series[symbol][:i]
+            bot.run_cycle()
+    if close:
+        recorder.close()
+    return fake, recorder
+
+
+def record_session_with_exits(path, series, cycles):
+    """
+    Como en vivo: entrada al cierre de cada vela y revisiones de salida
+    con el ticker a mitad de la vela siguiente (máximo, mínimo y cierre)
+    """
+    from advanced_bot import BitsoTradingBot
+    fake = FakeExchange()
+    prices = {}
+    fake.fetch_ticker = lambda symbol: {'symbol': symbol, 'last': prices[symbol]}
+    recorder = RecordingExchange(fake, path)
+    bot = BitsoTradingBot('config_advanced.json', exchange=recorder, notify=False)
+    bot.symbols = SYMBOLS
+    with contextlib.redirect_stdout(io.StringIO()):
+        for i in cycles:
+            for symbol in SYMBOLS:
+                fake.candles[symbol] = series[symbol][:i]
+                bot.analyze_symbol(symbol)
+            for column in (2, 3, 4):
+                for symbol in SYMBOLS:
+                    prices[symbol] = series[symbol][i][column]
+                    bot.check_exits(symbol)
+    recorder.close()
+    return fake
+
+
+def position_events(subscription):
+    return [(d['symbol'], d['side'], d['amount'], d['price'])
+            for _, topic, d in subscription.drain() if topic == 'position']
+
+
+def replay_config(symbols=SYMBOLS):
+    config_path = temp_path('config.json')
+    with open('config_advanced.json') as f:
+        config = json.load(f)
+    with open(config_path, 'w') as f:
+        json.dump(dict(config, symbols=symbols), f)
+    return config_path
+
+
+def sliding_series(n=200, volatility=0.01):
+    return {s: generate_candles(n, '5m', seed=i, volatility=volatility) for i, s in enumerate(SYMBOLS)}
+
+
+def test_ohlcv_delta_sliding_window():
+    candles = generate_candles(150)
+    previous = candles[0:100]
+    current = candles[1:101]
+    delta = encode_ohlcv(previous, current)
+    assert delta[0] == 1 and delta[1] == 99 and len(delta[2]) == 1
+    assert decode_ohlcv(previous, delta) == current
+
+    # La última vela (abierta) cambió: se reenvía esa fila
+    updated = [row[:] for row in current]
+    updated[-1][4] += 1
+    delta = encode_ohlcv(current, updated)
+    assert delta[1] == 99 and decode_ohlcv(current, delta) == updated
+
+    # Sin solapamiento: se guarda todo
+    assert encode_ohlcv(previous, candles[120:150]) == [0, 0, candles[120:150]]
+    assert decode_ohlcv(None, encode_ohlcv(None, current)) == current
+
+
+def test_record_read_replay_round_trip():
+    path = temp_path('journal.btj')
+    series = sliding_series()
+    fake, _ = record_session(path, series, range(100, 200))
+
+    fetches = [r for r in read_journal(path) if r.method == 'fetch_ohlcv']
+    assert len(fetches) == 2 * 100
+    for i, record in enumerate(fetches):
+        cycle = i // 2
+        assert record.result == series[record.args[0]][cycle:cycle + 100]
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        _, replay = replay_bitso(path, replay_config())
+    assert [(o['symbol'], o['side']) for o in replay.orders] == [(o['symbol'], o['side']) for o in fake.orders]
+    assert replay.divergences == []
+
+
+def test_replay_includes_exit_job_sells():
+    path = temp_path('exits.btj')
+    series = sliding_series(260, volatility=0.02)
+    subscription = bus.subscribe()
+    try:
+        fake = record_session_with_exits(path, series, range(100, 259))
+        live = position_events(subscription)
+
+        # Hubo ventas del trabajo de salidas (precio del ticker, no de cierre)
+        records = list(read_journal(path))
+        exit_sells = [r for prev, r in zip(records, records[1:])
+                      if r.method == 'create_market_sell_order' and prev.method == 'fetch_ticker']
+        assert exit_sells
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            _, replay = replay_bitso(path, replay_config())
+        assert replay.divergences == []
+        assert [(o['symbol'], o['side'], o['amount']) for o in replay.orders] == \
+               [(o['symbol'], o['side'], o['amount']) for o in fake.orders]
+        assert position_events(subscription) == live
+
+        # Sin el trabajo de salidas, las ventas cambian de momento: se detecta
+        from advanced_bot import BitsoTradingBot
+        check_exits = BitsoTradingBot.check_exits
+        BitsoTradingBot.check_exits = lambda self, symbol: None
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                _, replay = replay_bitso(path, replay_config())
+        finally:
+            BitsoTradingBot.check_exits = check_exits
+        assert any(kind == 'no reproducida' for kind, _, _ in replay.divergences)
+    finally:
+        bus.unsubscribe(subscription)
+
+
+def test_unclosed_session_keeps_flushed_records():
+    # Mismo escenario que un kill: se vuelca, se sigue grabando y el proceso muere
+    path = temp_path('crash.btj')
+    script = (
+        "import os, sys; sys.path.insert(0, {root!r});"
+        "from fake_exchange import FakeExchange;"
+        "from trade_journal import RecordingExchange;"
+        "r = RecordingExchange(FakeExchange(), {path!r}, flush_every=1000);"
+        "[r.fetch_ohlcv('BTC/MXN', timeframe='5m', limit=100) for _ in range(5)];"
+        "r.journal.flush();"
+        "[r.fetch_ohlcv('BTC/MXN', timeframe='5m', limit=100) for _ in range(3)];"
+        "os._exit(1)"
+    ).format(root=os.path.dirname(os.path.abspath(__file__)), path=path)
+    subprocess.run([sys.executable, '-c', script], check=False)
+    assert len(list(read_journal(path))) == 5
+
+    # Un bloque escrito a medias al final también se descarta
+    with open(path, 'ab') as f:
+        f.write(b'BTJB\xff\x00\x00\x00partial')
+    assert len(ReplayExchange(path).records) == 5
+
+
+def test_appended_sessions_after_crash():
+    path = temp_path('sessions.btj')
+    series = sliding_series(260)
+    _, recorder = record_session(path, series, range(100, 130), close=False)
+    recorder.journal.flush()
+    # El proceso murió a mitad de escribir un bloque
+    size = os.path.getsize(path)
+    with contextlib.redirect_stdout(io.StringIO()):
+        recorder.fetch_ohlcv('BTC/MXN', timeframe='5m', limit=100)
+    recorder.journal.flush()
+    with open(path, 'r+b') as f:
+        f.truncate(size + 20)
+
+    record_session(path, series, range(200, 230))
+
+    fetches = [r for r in read_journal(path) if r.method == 'fetch_ohlcv']
+    assert len(fetches) == 2 * 30 + 2 * 30
+    first, second = fetches[:60], fetches[60:]
+    assert first[-1].result == series['ETH/MXN'][29:129]
+    # Los deltas se reinician en cada sesión
+    assert second[0].result == series['BTC/MXN'][100:200]
+    assert second[-1].result == series['ETH/MXN'][129:229]
+
+
+if __name__ == "__main__":
+    print("🧪 Probando el diario de grabación y reproducción...")
+    failed = 0
+    for name, test in list(globals().items()):
+        if name.startswith('test_') and callable(test):
+            try:
+                test()
+                print(f"✅ {name}")
+            except Exception as e:
+                failed += 1
+                print(f"❌ {name}: {e!r}")
+    print("Todo bien!" if not failed else f"{failed} prueba(s) fallaron")
@@ -0,0 +1,452 @@
+# trade_journal.py
+"""
+Grabación y reproducción determinista de las respuestas del exchange.
+
+RecordingExchange envuelve el exchange real (ccxt) y guarda cada respuesta
+que consume el bot (velas, tickers, balances, confirmaciones de órdenes) en
+un diario binario comprimido con marcas de tiempo monotónicas.
+
+El diario es una secuencia de frames con longitud: un frame de inicio de
+sesión y bloques zlib independientes, uno por cada volcado. Se puede abrir
+en modo append tras un reinicio, y si el proceso muere a mitad de un
+bloque solo se pierde ese bloque final; lo anterior sigue siendo legible.
+ReplayExchange lee ese diario y se comporta como un exchange más: devuelve
+las mismas respuestas, en el mismo orden y con el mismo reloj, sin esperas,
+así que un día de operación se reproduce en segundos. La reproducción
+sigue el orden de los trabajos grabados (entradas al cierre de vela y
+revisiones de salida), no un ciclo fijo.
+
+Grabar:     "record_journal": "data/journal.btj" en config_advanced.json
+Reproducir: python trade_journal.py replay data/journal.btj
+Inspeccionar: python trade_journal.py dump data/journal.btj
+"""
+import argparse
+import contextlib
+import io
+import json
+import logging
+import struct
+import time
+import zlib
+from collections import defaultdict, deque, namedtuple
+
+SESSION_FRAME = b'BTJS'  # Inicio de una sesión de grabación (reinicia los deltas)
+BLOCK_FRAME = b'BTJB'    # Bloque de registros comprimido con zlib
+FRAME_HEADER = struct.Struct('<4sI')
+# Cabecera de cada registro: método, hora de pared, ns monotónicos, longitud del payload
+RECORD_HEADER = struct.Struct('<BdQI')
+
+RECORDED_METHODS = (
+    'fetch_ohlcv',
+    'fetch_ticker',
+    'fetch_balance',
+    'fetch_order',
+    'fetch_open_orders',
+    'load_markets',
+    'market',
+    'create_order',
+    'create_market_buy_order',
+    'create_market_sell_order',
+    'cancel_order',
+)
+METHOD_CODES = {name: code for code, name in enumerate(RECORDED_METHODS)}
+ORDER_METHODS = {'create_order', 'create_market_buy_order', 'create_market_sell_order', 'cancel_order'}
+# Lectura con la que empieza cada trabajo del bot y el método que la hizo
+JOB_ENTRY_POINTS = {'fetch_ohlcv': 'analyze_symbol', 'fetch_ticker': 'check_exits'}
+
+Record = namedtuple('Record', ['seq', 'method', 'wall_time', 'mono_ns', 'args', 'kwargs', 'result', 'error'])
+
+
+class RecordedError(Exception):
+    """Error del exchange grabado en el diario y relanzado al reproducir"""
+
+    def __init__(self, error_type, message):
+        super().__init__(f"{error_type}: {message}")
+        self.error_type = error_type
+
+
+class ReplayExhausted(Exception):
+    """No quedan respuestas grabadas para esa llamada"""
+
+
+def _ohlcv_key(args, kwargs):
+    symbol = args[0] if args else kwargs.get('symbol')
+    timeframe = args[1] if len(args) > 1 else kwargs.get('timeframe')
+    return (symbol, timeframe)
+
+
+def encode_ohlcv(previous, candles):
+    """
+    Codifica las velas como delta de la consulta anterior del mismo símbolo.
+    La ventana de 100 velas solo avanza una vela por ciclo, así que casi
+    todas las filas se reutilizan: se guarda [inicio, filas_iguales, nuevas].
+    """
+    if previous and candles:
+        for start, row in enumerate(previous):
+            if row[0] == candles[0][0]:
+                same = 0
+                for old, new in zip(previous[start:], candles):
+                    if old != new:
+                        break
+                    same += 1
+                return [start, same, candles[same:]]
+    return [0, 0, candles]
+
+
+def decode_ohlcv(previous, delta):
+    start, same, rows = delta
+    return (previous[start:start + same] if same else []) + rows
+
+
+class JournalWriter:
+    def __init__(self, path, flush_every=50):
+        self.file = open(path, 'ab')
+        self.file.write(FRAME_HEADER.pack(SESSION_FRAME, 0))
+        self.file.flush()
+        self.mono_start = time.monotonic_ns()
+        self.flush_every = flush_every
+        self.buffer = []
+        self.last_ohlcv = {}
+
+    def write(self, method, args, kwargs, result=None, error=None):
+        payload = {'args': args, 'kwargs': kwargs}
+        if error is not None:
+            payload['error'] = [type(error).__name__, str(error)]
+        elif method == 'fetch_ohlcv':
+            key = _ohlcv_key(args, kwargs)
+            payload['ohlcv'] = encode_ohlcv(self.last_ohlcv.get(key), result)
+            self.last_ohlcv[key] = result
+        else:
+            payload['result'] = result
+        data = json.dumps(payload, separators=(',', ':'), default=str).encode('utf-8')
+        header = RECORD_HEADER.pack(METHOD_CODES[method], time.time(), time.monotonic_ns() - self.mono_start, len(data))
+        self.buffer.append(header + data)
+
+        # Las órdenes se vuelcan a disco de inmediato; lo demás por lotes
+        if method in ORDER_METHODS or len(self.buffer) >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        if not self.buffer:
+            return
+        block = zlib.compress(b''.join(self.buffer))
+        self.file.write(FRAME_HEADER.pack(BLOCK_FRAME, len(block)) + block)
+        self.file.flush()
+        self.buffer = []
+
+    def close(self):
+        if self.file.closed:
+            return
+        self.flush()
+        self.file.close()
+
+
+def _read_blocks(path):
+    """
+    Itera (tipo, datos) de los frames del diario. Un bloque incompleto o
+    corrupto (proceso terminado a mitad de escritura) se descarta con un
+    aviso y la lectura continúa en la siguiente sesión, si la hay.
+    """
+    logger = logging.getLogger("Replay")
+    session_mark = FRAME_HEADER.pack(SESSION_FRAME, 0)
+    with open(path, 'rb') as f:
+        while True:
+            start = f.tell()
+            head = f.read(FRAME_HEADER.size)
+            if not head:
+                return
+            block = None
+            if len(head) == FRAME_HEADER.size:
+                kind, size = FRAME_HEADER.unpack(head)
+                if kind == SESSION_FRAME:
+                    yield kind, b''
+                    continue
+                data = f.read(size)
+                if kind == BLOCK_FRAME and len(data) == size:
+                    try:
+                        block = zlib.decompress(data)
+                    except zlib.error:
+                        pass
+            if block is not None:
+                yield BLOCK_FRAME, block
+                continue
+
+            # Frame dañado: saltar hasta el inicio de la siguiente sesión
+            f.seek(start + 1)
+            rest = f.read()
+            position = rest.find(session_mark)
+            if position < 0:
+                logger.warning(f"{path}: bloque final truncado, se ignora")
+                return
+            logger.warning(f"{path}: bloque truncado, se continúa en la siguiente sesión")
+            f.seek(start + 1 + position)
+
+
+def read_journal(path):
+    """Itera los registros del diario en orden de grabación"""
+    seq = 0
+    last_ohlcv = {}
+    for kind, block in _read_blocks(path):
+        # Cada sesión de grabación reinicia los deltas de velas
+        if kind == SESSION_FRAME:
+            last_ohlcv = {}
+            continue
+        offset = 0
+        while offset < len(block):
+            code, wall_time, mono_ns, size = RECORD_HEADER.unpack_from(block, offset)
+            offset += RECORD_HEADER.size
+            payload = json.loads(block[offset:offset + size])
+            offset += size
+            error = payload.get('error')
+            result = payload.get('result')
+            if 'ohlcv' in payload:
+                key = _ohlcv_key(payload['args'], payload['kwargs'])
+                result = decode_ohlcv(last_ohlcv.get(key), payload['ohlcv'])
+                last_ohlcv[key] = result
+            yield Record(seq, RECORDED_METHODS[code], wall_time, mono_ns,
+                         payload['args'], payload['kwargs'], result,
+                         RecordedError(*error) if error else None)
+            seq += 1
+
+
+class RecordingExchange:
+    """Envuelve un exchange ccxt y graba cada respuesta que consume el bot"""
+
+    def __init__(self, exchange, path, flush_every=50):
+        self.exchange = exchange
+        self.journal = JournalWriter(path, flush_every)
+
+    def __getattr__(self, name):
+        attr = getattr(self.exchange, name)
+        if name not in METHOD_CODES:
+            return attr
+
+        def recorded(*args, **kwargs):
+            try:
+                result = attr(*args, **kwargs)
+            except Exception as e:
+                self.journal.write(name, list(args), kwargs, error=e)
+                raise
+            self.journal.write(name, list(args), kwargs, result=result)
+            return result
+        return recorded
+
+    def close(self):
+        """Vuelca lo pendiente y cierra el diario (y el exchange envuelto)"""
+        self.journal.close()
+        close = getattr(self.exchange, 'close', None)
+        if close:
+            close()
+
+
+class ReplayExchange:
+    """
+    Exchange de reproducción: mismo interfaz que ccxt, respuestas del diario.
+
+    Las respuestas se sirven por (método, símbolo) en orden de grabación, así
+    que una versión modificada del bot puede saltarse o añadir llamadas sin
+    desalinear al resto. Una orden solo se da por reproducida si coincide
+    en lado y cantidad con la grabada dentro del mismo trabajo; si no, se
+    confirma sintéticamente y queda en `divergences`, igual que las órdenes
+    grabadas que el bot reproducido no volvió a enviar.
+    """
+
+    def __init__(self, path):
+        self.records = list(read_journal(path))
+        self.queues = defaultdict(deque)
+        for record in self.records:
+            self.queues[self._key(record.method, record.args, record.kwargs)].append(record)
+        self.consumed = set()
+        self.cursor = -1
+        self.job_start = None
+        self.job_end = None
+        self.orders = []
+        self.divergences = []
+        self.skipped = []
+        self.logger = logging.getLogger("Replay")
+
+    @staticmethod
+    def _key(method, args, kwargs):
+        symbol = args[0] if args else kwargs.get('symbol')
+        return (method, symbol if isinstance(symbol, str) else None)
+
+    @property
+    def exhausted(self):
+        return not any(self.queues[key] for key in self.queues if key[0] not in ORDER_METHODS)
+
+    def milliseconds(self):
+        """Reloj virtual: la hora grabada de la última respuesta consumida"""
+        if not self.records:
+            return 0
+        return int(self.records[max(self.cursor, 0)].wall_time * 1000)
+
+    def _consume(self, method, args, kwargs):
+        queue = self.queues.get(self._key(method, list(args), kwargs))
+        if not queue:
+            return None
+        record = queue.popleft()
+        self.consumed.add(record.seq)
+        self.cursor = max(self.cursor, record.seq)
+        return record
+
+    def _discard(self, record):
+        self.queues[self._key(record.method, record.args, record.kwargs)].remove(record)
+        self.consumed.add(record.seq)
+
+    def jobs(self):
+        """
+        Itera los trabajos en el orden en que corrieron en vivo, como
+        (método del bot, símbolo). Cada trabajo empieza con la lectura de su
+        símbolo (JOB_ENTRY_POINTS) y dura hasta que empieza el siguiente; el
+        reloj virtual se sitúa en su inicio. Al terminar cada trabajo, lo
+        grabado en él que el bot reproducido no pidió se descarta.
+        """
+        starts = [r for r in self.records if r.method in JOB_ENTRY_POINTS]
+        for i, record in enumerate(starts):
+            if record.seq in self.consumed:
+                continue
+            self.job_start = record.seq
+            self.job_end = starts[i + 1].seq if i + 1 < len(starts) else len(self.records)
+            self.cursor = max(self.cursor, record.seq)
+            yield JOB_ENTRY_POINTS[record.method], record.args[0]
+
+            for missed in self.records[record.seq:self.job_end]:
+                if missed.seq in self.consumed:
+                    continue
+                self._discard(missed)
+                self.skipped.append(missed)
+                if missed.method in ORDER_METHODS:
+                    self.divergences.append(('no reproducida', missed.method, missed.args))
+                    self.logger.warning(f"Orden grabada no reproducida: {missed.method} {missed.args}")
+        self.job_start = self.job_end = None
+
+    @staticmethod
+    def _order_details(record):
+        """(lado, cantidad) de una orden grabada"""
+        args, kwargs = record.args, record.kwargs
+        if record.method == 'create_order':
+            side = args[2] if len(args) > 2 else kwargs.get('side')
+            return side, args[3] if len(args) > 3 else kwargs.get('amount')
+        if record.method in ('create_market_buy_order', 'create_market_sell_order'):
+            side = 'buy' if record.method == 'create_market_buy_order' else 'sell'
+            return side, args[1] if len(args) > 1 else kwargs.get('amount')
+        return None, None
+
+    def _matches_order(self, record, side, amount):
+        # La orden grabada tiene que ser de este mismo trabajo
+        if self.job_end is not None and not self.job_start < record.seq < self.job_end:
+            return False
+        recorded_side, recorded_amount = self._order_details(record)
+        if recorded_side != side:
+            return False
+        if amount is None or recorded_amount is None:
+            return amount == recorded_amount
+        return abs(recorded_amount - amount) <= 1e-12 * max(1.0, abs(amount))
+
+    def _replay(self, method, args, kwargs):
+        record = self._consume(method, args, kwargs)
+        if record is None:
+            raise ReplayExhausted(f"Sin respuestas grabadas para {method}{tuple(args)}")
+        if record.error:
+            raise record.error
+        return record.result
+
+    def _replay_order(self, method, symbol, side, amount, args, kwargs):
+        queue = self.queues.get(self._key(method, list(args), kwargs))
+        record = None
+        if queue and self._matches_order(queue[0], side, amount):
+            record = self._consume(method, args, kwargs)
+        if record is None:
+            # El bot reproducido tomó una decisión distinta a la grabada
+            order = {'id': f"replay-{len(self.orders) + 1}", 'symbol': symbol, 'side': side,
+                     'amount': amount, 'status': 'closed'}
+            self.divergences.append(('no grabada', method, [symbol, side, amount]))
+            self.logger.warning(f"Orden no grabada: {method} {symbol} {side} {amount}")
+        elif record.error:
+            raise record.error
+        else:
+            order = record.result
+        self.orders.append(order)
+        return order
+
+    def fetch_ohlcv(self, symbol, timeframe='1m', limit=None, *args, **kwargs):
+        return self._replay('fetch_ohlcv', (symbol,), {})
+
+    def fetch_ticker(self, symbol, *args, **kwargs):
+        return self._replay('fetch_ticker', (symbol,), {})
+
+    def fetch_balance(self, *args, **kwargs):
+        return self._replay('fetch_balance', (), {})
+
+    def fetch_order(self, id, symbol=None, *args, **kwargs):
+        return self._replay('fetch_order', (id, symbol), {})
+
+    def fetch_open_orders(self, symbol=None, *args, **kwargs):
+        return self._replay('fetch_open_orders', (symbol,), {})
+
+    def load_markets(self, *args, **kwargs):
+        return self._replay('load_markets', (), {})
+
+    def market(self, symbol):
+        return self._replay('market', (symbol,), {})
+
+    def create_order(self, symbol, type, side, amount, price=None, params=None):
+        return self._replay_order('create_order', symbol, side, amount, (symbol,), {})
+
+    def create_market_buy_order(self, symbol, amount, params=None):
+        return self._replay_order('create_market_buy_order', symbol, 'buy', amount, (symbol,), {})
+
+    def create_market_sell_order(self, symbol, amount, params=None):
+        return self._replay_order('create_market_sell_order', symbol, 'sell', amount, (symbol,), {})
+
+    def cancel_order(self, id, symbol=None, params=None):
+        return self._replay_order('cancel_order', symbol, None, None, (id, symbol), {})
+
+
+def replay_bitso(path, config_path='config_advanced.json'):
+    """Reproduce un diario completo a través de BitsoTradingBot"""
+    from advanced_bot import BitsoTradingBot
+    exchange = ReplayExchange(path)
+    bot = BitsoTradingBot(config_path, exchange=exchange, notify=False)
+
+    start = time.perf_counter()
+    jobs = 0
+    with contextlib.redirect_stdout(io.StringIO()):
+        # Mismo orden de trabajos que en vivo: entradas y revisiones de salida
+        for job, symbol in exchange.jobs():
+            getattr(bot, job)(symbol)
+            jobs += 1
+    elapsed = time.perf_counter() - start
+
+    span = exchange.records[-1].wall_time - exchange.records[0].wall_time if exchange.records else 0
+    print('=' * 50)
+    print('REPRODUCCIÓN DEL DIARIO')
+    print('=' * 50)
+    print(f"Registros: {len(exchange.records)} | Trabajos: {jobs} | Sin reproducir: {len(exchange.skipped)}")
+    print(f"Tiempo grabado: {span / 3600:.2f}h | Reproducido en: {elapsed:.2f}s")
+    print(f"Órdenes: {len(exchange.orders)} | Divergencias: {len(exchange.divergences)}")
+    print(f"Posiciones abiertas al final: {list(bot.active_positions)}")
+    return bot, exchange
+
+
+def dump(path):
+    for record in read_journal(path):
+        status = f"ERROR {record.error}" if record.error else "ok"
+        print(f"{record.seq:>6} {record.mono_ns / 1e9:>12.3f}s {record.method:<26} {record.args} {status}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Diario de respuestas del exchange')
+    parser.add_argument('command', choices=['replay', 'dump'])
+    parser.add_argument('path')
+    parser.add_argument('--config', default='config_advanced.json')
+    args = parser.parse_args()
+
+    if args.command == 'replay':
+        replay_bitso(args.path, args.config)
+    else:
+        dump(args.path)
+
+
+if __name__ == "__main__":
+    main()